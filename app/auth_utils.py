@@ -2,8 +2,10 @@ from datetime import datetime, timedelta
 from jose import jwt
 from passlib.context import CryptContext
 
-# Secret key (change in production)
-SECRET_KEY = "SUPER_SECRET_KEY"
+from app.config import settings
+
+# Secret key (set SECRET_KEY in production)
+SECRET_KEY = settings.secret_key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
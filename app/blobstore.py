@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from app.config import settings
+
+
+# =====================================================
+# ✅ Content-Addressed Blob Stores
+# =====================================================
+# Blobs are keyed by the sha256 of their bytes, so identical payloads
+# (same email body sent to 10k users) are stored exactly once.
+
+def blob_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class LocalBlobStore:
+    # <root>/ab/abcdef... (two-level fan-out keeps directories small)
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data):
+        digest = blob_digest(data)
+        path = self._path(digest)
+
+        if os.path.exists(path):
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write + rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        return digest
+
+    def get(self, digest):
+        with open(self._path(digest), "rb") as f:
+            return f.read()
+
+
+class S3BlobStore:
+    # Any S3-compatible endpoint (AWS, MinIO, R2...), needs boto3
+
+    def __init__(self, bucket, prefix="", endpoint_url=None):
+        import boto3
+
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, digest):
+        return f"{self.prefix}{digest[:2]}/{digest}"
+
+    def put(self, data):
+        from botocore.exceptions import ClientError
+
+        digest = blob_digest(data)
+        key = self._key(digest)
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return digest
+        except ClientError:
+            pass
+
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+        return digest
+
+    def get(self, digest):
+        obj = self.client.get_object(Bucket=self.bucket, Key=self._key(digest))
+        return obj["Body"].read()
+
+
+_store = None
+
+
+def get_blob_store():
+    global _store
+
+    if _store is None:
+        if settings.blob_store == "s3":
+            _store = S3BlobStore(settings.s3_bucket, settings.s3_prefix, settings.s3_endpoint_url)
+        else:
+            _store = LocalBlobStore(settings.blob_dir)
+
+    return _store
+
+
+# =====================================================
+# ✅ Row Fields (inline below threshold, blob above)
+# =====================================================
+# Offloaded fields keep only <field>_blob (sha256) + <field>_size in
+# the row, the inline column is NULL. Payload is JSON, others are text.
+JSON_FIELDS = {"payload"}
+
+
+def _encode(field, value):
+    if field in JSON_FIELDS:
+        return json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    return value.encode()
+
+
+def _decode(field, data):
+    if field in JSON_FIELDS:
+        return json.loads(data)
+    return data.decode()
+
+
+def field_values(field, value):
+    # Column values for <field>, offloading to the blob store if large.
+    # Workers call this before opening their finalize transaction so no
+    # DB connection is held during the blob upload.
+    if value is None:
+        return {field: None, f"{field}_blob": None, f"{field}_size": None}
+
+    data = _encode(field, value)
+
+    if len(data) > settings.blob_threshold_bytes:
+        return {field: None, f"{field}_blob": get_blob_store().put(data), f"{field}_size": len(data)}
+
+    return {field: value, f"{field}_blob": None, f"{field}_size": len(data)}
+
+
+def put_field(row, field, value):
+    for column, column_value in field_values(field, value).items():
+        setattr(row, column, column_value)
+
+
+def field_value(field, inline, digest):
+    if digest:
+        return _decode(field, get_blob_store().get(digest))
+
+    return inline
+
+
+def get_field(row, field):
+    # Only call this where the full value is needed (worker, detail views)
+    return field_value(field, getattr(row, field), getattr(row, f"{field}_blob"))
+
+
+def inline_or_ref(row, field):
+    # Cheap display value for listings / exports, never fetches the blob
+    digest = getattr(row, f"{field}_blob")
+
+    if digest:
+        return f"<blob sha256:{digest[:12]} {getattr(row, f'{field}_size')} bytes>"
+
+    return getattr(row, field)
+
+
+def put_blob(text):
+    # Standalone blob (e.g. tracebacks referenced from logs)
+    data = text.encode()
+    return get_blob_store().put(data), len(data)
+
+
+def get_blob(digest):
+    return get_blob_store().get(digest).decode()
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from sqlalchemy import case, update
+
+# RUNNING tasks can't be stopped from outside: they are flagged
+# CANCELLING and the worker stops at its next checkpoint
+from app.models import Task, CANCELLING
+from app.workflows import fail_dependents
+
+CANCELLABLE_STATUSES = ["SCHEDULED", "PENDING", "WAITING", "RETRYING", "RUNNING"]
+
+REVOKE_BATCH_SIZE = 500
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+# =====================================================
+# ✅ Worker Checkpoint (cooperative interruption)
+# =====================================================
+def checkpoint(db, task_id):
+    # One-column read, called between handler steps / before external I/O
+    status = db.query(Task.status).filter(Task.id == task_id).scalar()
+
+    if status in [CANCELLING, "CANCELLED"]:
+        raise TaskCancelled()
+
+
+# =====================================================
+# ✅ Broker Revocation
+# =====================================================
+def revoke_messages(celery_task_ids):
+    # Workers drop revoked messages without running them. Best effort:
+    # the DB status stays the source of truth if the broker is down.
+    celery_task_ids = [i for i in celery_task_ids if i]
+    if not celery_task_ids:
+        return 0
+
+    # Lazy: keeps Celery out of the API's cold start
+    from app.celery_app import celery
+
+    try:
+        for i in range(0, len(celery_task_ids), REVOKE_BATCH_SIZE):
+            celery.control.revoke(celery_task_ids[i:i + REVOKE_BATCH_SIZE])
+    except Exception as exc:
+        print("⚠️ Revoke failed, workers will skip via DB status:", exc)
+        return 0
+
+    return len(celery_task_ids)
+
+
+# =====================================================
+# ✅ Set-Based Cancel (single + bulk)
+# =====================================================
+def cancel_tasks(db, *filters):
+    # One UPDATE for every matching cancellable task: RUNNING -> CANCELLING,
+    # everything else -> CANCELLED, and fail WAITING dependents. Caller
+    # commits, THEN passes "celery_ids" to revoke_messages() so no row
+    # locks are held across the broker round trip (and nothing is revoked
+    # if the commit fails).
+    rows = db.execute(
+        update(Task)
+        .where(Task.status.in_(CANCELLABLE_STATUSES), *filters)
+        .values(
+            status=case((Task.status == "RUNNING", CANCELLING), else_="CANCELLED"),
+            completed_at=case((Task.status == "RUNNING", Task.completed_at), else_=datetime.utcnow()),
+        )
+        .returning(Task.id, Task.status, Task.celery_task_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    cancelled = [task_id for task_id, status, _ in rows if status == "CANCELLED"]
+    cancelling = [task_id for task_id, status, _ in rows if status == CANCELLING]
+
+    # Running tasks fail their dependents when they actually stop
+    fail_dependents(db, cancelled)
+
+    celery_ids = [celery_id for _, status, celery_id in rows if status == "CANCELLED"]
+
+    return {"cancelled": cancelled, "cancelling": cancelling, "celery_ids": celery_ids}
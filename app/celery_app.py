@@ -26,10 +26,14 @@
 from celery import Celery
 from kombu import Queue
 
+from app.config import settings
+
+REDIS_URL = settings.redis_url
+
 celery = Celery(
     "task_scheduler",
-    broker="redis://localhost:6379/0",
-    backend="redis://localhost:6379/0",
+    broker=REDIS_URL,
+    backend=REDIS_URL,
     include=[
         "app.tasks",
         "app.scheduler",
@@ -51,6 +55,13 @@ celery.conf.task_queues = (
     Queue("batch"),    # Reports / Heavy jobs
 )
 
+# ✅ Message priorities on Redis (0 = served first, see app/fairshare.py)
+celery.conf.broker_transport_options = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+
 # Default routing
 celery.conf.task_routes = {
     "app.tasks.execute_task": {"queue": "normal"},
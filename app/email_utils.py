@@ -1,15 +1,13 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.config import settings
 
-SMTP_EMAIL = os.getenv("SMTP_EMAIL")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
-SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_EMAIL = settings.smtp_email
+SMTP_PASSWORD = settings.smtp_password
+SMTP_SERVER = settings.smtp_server
+SMTP_PORT = settings.smtp_port
 
 
 def send_email(to_email: str, subject: str, body: str):
@@ -0,0 +1,166 @@
+from collections import deque
+
+from sqlalchemy import select, func, case
+
+from app.config import settings
+from app.models import Task, CANCELLING
+from app.models_user import User
+
+
+# =====================================================
+# ✅ Priority Levels -> Celery Message Priority
+# =====================================================
+# Redis transport semantics: 0 is served first, 9 last
+PRIORITY_LEVELS = {"high": 0, "normal": 5, "low": 9}
+DEFAULT_PRIORITY = PRIORITY_LEVELS["normal"]
+
+# Statuses that occupy a slot in the broker / on a worker (CANCELLING
+# tasks keep running until their next checkpoint)
+IN_FLIGHT_STATUSES = ["PENDING", "RUNNING", "RETRYING", CANCELLING]
+
+
+# =====================================================
+# ✅ Weighted Round-Robin across Tenants
+# =====================================================
+def fair_order(queues, weights, slots, budget):
+    # queues:  {user_id: [task ids, best first]}, users in service order
+    # weights: {user_id: tasks per round}
+    # slots:   {user_id: free in-flight slots} (None = unlimited)
+    # Returns task ids interleaved so each round every tenant gets
+    # `weight` tasks, until the batch budget or all slots are used.
+    queues = {user_id: deque(ids) for user_id, ids in queues.items() if ids}
+    slots = dict(slots)
+    order = []
+
+    while queues and len(order) < budget:
+        for user_id in list(queues):
+            queue = queues[user_id]
+            take = weights.get(user_id, 1)
+
+            if slots.get(user_id) is not None:
+                take = min(take, slots[user_id])
+                slots[user_id] -= take
+
+            for _ in range(min(take, len(queue), budget - len(order))):
+                order.append(queue.popleft())
+
+            if not queue or slots.get(user_id) == 0:
+                del queues[user_id]
+
+            if len(order) >= budget:
+                break
+
+    return order
+
+
+def fair_rounds(counts, weights, slots, budget):
+    # Rounds fair_order() needs to fill the batch, worked out from each
+    # tenant's due count alone: only ranks <= rounds x weight can be
+    # picked, so nothing past that is loaded from the database
+    left = {
+        user_id: count if slots.get(user_id) is None else min(count, slots[user_id])
+        for user_id, count in counts.items()
+    }
+    taken = 0
+    rounds = 0
+
+    while taken < budget and any(left.values()):
+        rounds += 1
+        for user_id in left:
+            take = min(weights.get(user_id, 1), left[user_id])
+            left[user_id] -= take
+            taken += take
+
+    return rounds
+
+
+# =====================================================
+# ✅ Tenant Weights + In-Flight Caps
+# =====================================================
+def tenant_weights(db, user_ids):
+    return {
+        user_id: max(1, weight or 1)
+        for user_id, weight in db.execute(
+            select(User.id, User.dispatch_weight).where(User.id.in_(user_ids))
+        ).all()
+    }
+
+
+def free_slots(db, weights):
+    # {user_id: free in-flight slots} for {user_id: weight}, {} = no caps
+    cap = settings.tenant_max_in_flight
+    if cap <= 0 or not weights:
+        return {}
+
+    in_flight = dict(db.execute(
+        select(Task.user_id, func.count())
+        .where(Task.user_id.in_(list(weights)), Task.status.in_(IN_FLIGHT_STATUSES))
+        .group_by(Task.user_id)
+    ).all())
+
+    # Caps scale with the tenant's weight
+    return {
+        user_id: max(0, cap * weight - in_flight.get(user_id, 0))
+        for user_id, weight in weights.items()
+    }
+
+
+# =====================================================
+# ✅ Batch Selection
+# =====================================================
+def select_fair_batch(db, now):
+    budget = settings.dispatch_batch_size
+    due = [Task.status == "SCHEDULED", Task.run_at <= now]
+
+    # Tenants with due tasks: how many, and since when
+    tenants = db.execute(
+        select(Task.user_id, func.count(), func.min(Task.run_at))
+        .where(*due)
+        .group_by(Task.user_id)
+    ).all()
+
+    if not tenants:
+        return []
+
+    counts = {user_id: count for user_id, count, _ in tenants}
+    oldest = {user_id: run_at for user_id, _, run_at in tenants}
+
+    # Serve tenants that have waited longest first
+    order = sorted(counts, key=lambda u: (oldest[u], u or ""))
+    user_ids = [u for u in order if u is not None]
+
+    weights = tenant_weights(db, user_ids)
+    slots = free_slots(db, {u: weights.get(u, 1) for u in user_ids})
+    rounds = fair_rounds(counts, weights, slots, budget)
+
+    if not rounds:
+        return []
+
+    # Oldest / highest-priority due tasks per tenant (window function),
+    # only as deep as `rounds` of the round-robin can reach, so a tick
+    # loads about `budget` rows however many tenants are backlogged
+    weight = case((User.dispatch_weight > 1, User.dispatch_weight), else_=1)
+
+    ranked = select(
+        Task.id,
+        Task.user_id,
+        weight.label("weight"),
+        func.row_number().over(
+            partition_by=Task.user_id,
+            order_by=(func.coalesce(Task.priority, DEFAULT_PRIORITY), Task.run_at)
+        ).label("rank")
+    ).outerjoin(User, User.id == Task.user_id).where(*due).subquery()
+
+    rows = db.execute(
+        select(ranked.c.id, ranked.c.user_id)
+        .where(ranked.c.rank <= rounds * ranked.c.weight)
+        .order_by(ranked.c.user_id, ranked.c.rank)
+    ).all()
+
+    queues = {user_id: [] for user_id in order}
+    for task_id, user_id in rows:
+        # Tenants that became due after the count wait for the next tick
+        if user_id in queues:
+            queues[user_id].append(task_id)
+
+    return fair_order(queues, weights, slots, budget)
@@ -4,19 +4,14 @@ from fastapi.responses import FileResponse
 
 import os
 
-from dotenv import load_dotenv
-
-from app.database import engine
-from app.models import Base, Task
-from app.models_user import User
+from app.config import settings
 
 # Routers
 from app.routes.task_routes import router as task_router
 from app.routes.auth_routes import router as auth_router
+from app.routes.workflow_routes import router as workflow_router
 from fastapi.security import HTTPBearer
 
-load_dotenv()
-
 # -----------------------------
 # FastAPI App
 # -----------------------------
@@ -35,16 +30,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# -----------------------------
-# Create Tables (Task + User)
-# -----------------------------
-Base.metadata.create_all(bind=engine)
-
 # -----------------------------
 # Include Routers
 # -----------------------------
 app.include_router(task_router)
 app.include_router(auth_router)
+app.include_router(workflow_router)
 
 
 # =========================================================
@@ -52,7 +43,7 @@ app.include_router(auth_router)
 # =========================================================
 @app.get("/download-report/{task_id}")
 def download_report(task_id: str):
-    filepath = f"reports/report_{task_id}.pdf"
+    filepath = os.path.join(settings.report_dir, f"report_{task_id}.pdf")
 
     if not os.path.exists(filepath):
         return {"error": "Report not found"}
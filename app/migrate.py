@@ -0,0 +1,55 @@
+# =====================================================
+# ✅ Schema Management (explicit step, never at import)
+# =====================================================
+# Usage: python -m app.migrate
+#
+# Creates missing tables, then adds missing (nullable) columns and
+# indexes to existing ones. API / worker / beat processes don't
+# touch the schema, run this once per deploy before starting them.
+
+from sqlalchemy import inspect, text
+
+from app.database import Base, engine
+
+# Register every table on Base.metadata
+from app import models, models_user  # noqa: F401
+
+
+def upgrade_existing_tables():
+    inspector = inspect(engine)
+    added = []
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+                added.append(f"{table.name}.{column.name}")
+
+            indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(bind=conn)
+                    added.append(index.name)
+
+    return added
+
+
+def migrate():
+    Base.metadata.create_all(bind=engine)
+    return upgrade_existing_tables()
+
+
+if __name__ == "__main__":
+    for name in migrate():
+        print("➕ Added", name)
+    print("✅ Database schema is up to date")
@@ -1,8 +1,15 @@
-from sqlalchemy import Column, String, DateTime, Integer, Text
+from sqlalchemy import Column, String, DateTime, Integer, Text, JSON, Index
 from datetime import datetime
 from app.database import Base
 from sqlalchemy.dialects.postgresql import JSONB
 
+# JSONB on Postgres, plain JSON on stand-in databases (SQLite benchmarks)
+JSONB_TYPE = JSON().with_variant(JSONB(), "postgresql")
+
+# RUNNING task flagged for cancellation, still occupies its worker until
+# the next checkpoint (here so fairshare and cancellation can share it)
+CANCELLING = "CANCELLING"
+
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -12,13 +19,16 @@ class Task(Base):
     status = Column(String)
     task_type = Column(String)
 
-    payload = Column(JSONB)
+    payload = Column(JSONB_TYPE)
 
     retries = Column(Integer, default=0)
     max_retries = Column(Integer, default=3)
 
     run_at = Column(DateTime)
 
+    # ✅ Celery message priority (0 = highest, see app/fairshare.py)
+    priority = Column(Integer, nullable=True)
+
     celery_task_id = Column(String, nullable=True)
 
     # ✅ NEW: Execution Tracking
@@ -31,11 +41,27 @@ class Task(Base):
     result = Column(Text)
     error_message = Column(Text)
 
+    # ✅ Blob Store Refs (sha256 + size), inline column is NULL when offloaded
+    payload_blob = Column(String, nullable=True)
+    payload_size = Column(Integer, nullable=True)
+    result_blob = Column(String, nullable=True)
+    result_size = Column(Integer, nullable=True)
+    error_message_blob = Column(String, nullable=True)
+    error_message_size = Column(Integer, nullable=True)
+    traceback_blob = Column(String, nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # ✅ MOST IMPORTANT: Task Owner
     user_id = Column(String, nullable=True)
 
+    __table_args__ = (
+        # Scheduler: due SCHEDULED tasks
+        Index("ix_tasks_status_run_at", "status", "run_at"),
+        # Per-user listing + in-flight counts
+        Index("ix_tasks_user_status", "user_id", "status"),
+    )
+
 
 class ArchivedTask(Base):
     __tablename__ = "archived_tasks"
@@ -43,18 +69,46 @@ class ArchivedTask(Base):
     id = Column(String, primary_key=True)
     status = Column(String)
     task_type = Column(String)
-    payload = Column(JSONB)
+    payload = Column(JSONB_TYPE)
     retries = Column(Integer)
     max_retries = Column(Integer)
     run_at = Column(DateTime)
+    priority = Column(Integer, nullable=True)
     celery_task_id = Column(String, nullable=True)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     logs = Column(Text)
     result = Column(Text)
     error_message = Column(Text)
+    payload_blob = Column(String, nullable=True)
+    payload_size = Column(Integer, nullable=True)
+    result_blob = Column(String, nullable=True)
+    result_size = Column(Integer, nullable=True)
+    error_message_blob = Column(String, nullable=True)
+    error_message_size = Column(Integer, nullable=True)
+    traceback_blob = Column(String, nullable=True)
     created_at = Column(DateTime)
     user_id = Column(String, nullable=True)
     
     # ✅ Extra field for when it was archived
-    archived_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+# =====================================================
+# ✅ Workflows (Task Dependency Graphs)
+# =====================================================
+class WorkflowNode(Base):
+    __tablename__ = "workflow_nodes"
+
+    task_id = Column(String, primary_key=True)
+    workflow_id = Column(String, index=True)
+
+    # Parents that haven't succeeded yet, the task is released at 0
+    pending_deps = Column(Integer, default=0)
+
+
+class TaskDependency(Base):
+    __tablename__ = "task_dependencies"
+
+    # task_id runs only after depends_on succeeded
+    task_id = Column(String, primary_key=True)
+    depends_on = Column(String, primary_key=True, index=True)
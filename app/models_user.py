@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Integer
 from datetime import datetime
 from uuid import uuid4
 
@@ -14,4 +14,7 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
 
+    # ✅ Fair-share weight (tasks per dispatch round, default 1)
+    dispatch_weight = Column(Integer, nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
@@ -1,14 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from uuid import uuid4
 from datetime import datetime
+from typing import Optional
 import os
 import csv
 import io
+import hashlib
 from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import case, func
+from sqlalchemy.orm import defer
 
+from app.config import settings
 from app.database import SessionLocal
-from app.models import Task
-from app.schemas import TaskCreate
+from app.models import Task, WorkflowNode
+from app.schemas import (
+    TaskCreate, BulkCancelRequest, TaskResponse, TaskListResponse, TaskDetailResponse,
+    TaskScheduledResponse, MessageResponse, BulkCancelResponse, TaskBlobResponse
+)
+from app.workflows import add_node, UPSTREAM_FAILED
+from app.cancellation import cancel_tasks, revoke_messages
+from app.cache import TTLCache
+from app.blobstore import put_field, get_field, field_value, get_blob, inline_or_ref
+from app.fairshare import PRIORITY_LEVELS
 
 from app.auth_dependency import get_current_user
 
@@ -18,7 +31,7 @@ router = APIRouter()
 # =========================================================
 # ✅ 1. Schedule New Task (User Protected)
 # =========================================================
-@router.post("/schedule-task/")
+@router.post("/schedule-task/", response_model=TaskScheduledResponse)
 def schedule_task(
     data: TaskCreate,
     current_user=Depends(get_current_user)
@@ -27,62 +40,95 @@ def schedule_task(
 
     run_time = datetime.strptime(data.run_at, "%Y-%m-%d %H:%M")
 
+    if data.priority and data.priority not in PRIORITY_LEVELS:
+        db.close()
+        raise HTTPException(status_code=400, detail=f"Priority must be one of {list(PRIORITY_LEVELS)}")
+
     new_task = Task(
         id=str(uuid4()),
         status="SCHEDULED",
         task_type=data.task_type,
-        payload=data.payload,
         retries=0,
         run_at=run_time,
+        priority=PRIORITY_LEVELS.get(data.priority),
 
         # ✅ THIS IS IMPORTANT
         user_id=current_user.id
     )
 
+    # Large payloads are offloaded to the blob store (hash + size in row)
+    put_field(new_task, "payload", data.payload)
+
+    # -------------------------------
+    # 🔗 Dependencies (optional)
+    # -------------------------------
+    if data.depends_on:
+        parent_ids = list(dict.fromkeys(data.depends_on))
+
+        # Lock parents so none can finish between our check and commit
+        parents = db.query(Task).filter(
+            Task.id.in_(parent_ids)
+        ).with_for_update().all()
+
+        if len(parents) != len(parent_ids) or any(p.user_id != current_user.id for p in parents):
+            db.close()
+            raise HTTPException(status_code=404, detail="Parent task not found")
+
+        if any(p.status in ["FAILED", "CANCELLED", UPSTREAM_FAILED] for p in parents):
+            db.close()
+            raise HTTPException(status_code=400, detail="Parent task already failed or cancelled")
+
+        nodes = db.query(WorkflowNode).filter(WorkflowNode.task_id.in_(parent_ids)).all()
+
+        # A task belongs to exactly one workflow, so parents can't span several
+        workflow_ids = {n.workflow_id for n in nodes}
+        if len(workflow_ids) > 1:
+            db.close()
+            raise HTTPException(status_code=400, detail="Parent tasks belong to different workflows")
+
+        workflow_id = workflow_ids.pop() if workflow_ids else str(uuid4())
+
+        # Standalone parents join the workflow as roots
+        known = {n.task_id for n in nodes}
+        for parent in parents:
+            if parent.id not in known:
+                db.add(WorkflowNode(task_id=parent.id, workflow_id=workflow_id, pending_deps=0))
+
+        pending = sum(1 for p in parents if p.status != "SUCCESS")
+        add_node(db, new_task, workflow_id, parent_ids, pending_deps=pending)
+
     db.add(new_task)
     db.commit()
     db.refresh(new_task)
+    db.close()
 
     return {"message": "Task scheduled successfully!", "task_id": new_task.id}
 
 # =========================================================
 # ✅ 2. List Tasks (Only Current User)
 # =========================================================
-@router.get("/tasks/")
+# Exactly the TaskResponse columns: plain rows, no ORM instances
+TASK_LIST_COLUMNS = [getattr(Task, name) for name in TaskResponse.model_fields]
+
+
+@router.get("/tasks/", response_model=TaskListResponse)
 def list_tasks(current_user=Depends(get_current_user)):
     db = SessionLocal()
 
-    tasks = db.query(Task).filter(
+    tasks = db.query(*TASK_LIST_COLUMNS).filter(
         Task.user_id == current_user.id
     ).order_by(Task.created_at.desc()).all()
 
     db.close()
 
-    return {
-        "count": len(tasks),
-        "tasks": [
-            {
-                "id": t.id,
-                "status": t.status,
-                "task_type": t.task_type,
-                "payload": t.payload,
-                "retries": t.retries,
-                "result": t.result,
-                "error_message": t.error_message,
-                "run_at": t.run_at,
-                "created_at": t.created_at,
-                "completed_at": t.completed_at,
-                "logs": t.logs
-            }
-            for t in tasks
-        ]
-    }
+    # Rows go straight into TaskListResponse (validated by attribute)
+    return {"count": len(tasks), "tasks": tasks}
 
 
 # =========================================================
 # ✅ 3. Cancel Task (Only Owner Allowed)
 # =========================================================
-@router.post("/tasks/{task_id}/cancel")
+@router.post("/tasks/{task_id}/cancel", response_model=MessageResponse)
 def cancel_task(
     task_id: str,
     current_user=Depends(get_current_user)
@@ -92,23 +138,73 @@ def cancel_task(
     task = db.query(Task).filter(Task.id == task_id).first()
 
     if not task:
+        db.close()
         raise HTTPException(status_code=404, detail="Task not found")
 
     # ✅ Ownership Check
     if task.user_id != current_user.id:
+        db.close()
         raise HTTPException(status_code=403, detail="Not allowed")
 
-    if task.status not in ["SCHEDULED", "PENDING"]:
+    status = task.status
+
+    # ✅ Revokes the broker message, RUNNING tasks stop at next checkpoint
+    outcome = cancel_tasks(db, Task.id == task_id, Task.user_id == current_user.id)
+    db.commit()
+    db.close()
+
+    # After the commit: no row locks held during the broker round trip
+    revoke_messages(outcome["celery_ids"])
+
+    if outcome["cancelling"]:
+        return {"message": "Cancellation requested, task will stop at its next checkpoint"}
+
+    if not outcome["cancelled"]:
         raise HTTPException(
             status_code=400,
-            detail=f"Task already {task.status}, cannot cancel"
+            detail=f"Task already {status}, cannot cancel"
         )
 
-    task.status = "CANCELLED"
+    return {"message": "Task cancelled successfully"}
+
+
+# =========================================================
+# ✅ 3b. Bulk Cancel (by ids / type / run_at range)
+# =========================================================
+@router.post("/tasks/cancel", response_model=BulkCancelResponse)
+def bulk_cancel_tasks(
+    data: BulkCancelRequest,
+    current_user=Depends(get_current_user)
+):
+    filters = [Task.user_id == current_user.id]
+
+    if data.ids is not None:
+        filters.append(Task.id.in_(data.ids))
+    if data.task_type:
+        filters.append(Task.task_type == data.task_type)
+    if data.run_at_from:
+        filters.append(Task.run_at >= datetime.strptime(data.run_at_from, "%Y-%m-%d %H:%M"))
+    if data.run_at_to:
+        filters.append(Task.run_at <= datetime.strptime(data.run_at_to, "%Y-%m-%d %H:%M"))
+
+    if len(filters) == 1:
+        raise HTTPException(status_code=400, detail="Give ids, task_type or a run_at range")
+
+    db = SessionLocal()
+
+    # ✅ One set-based UPDATE + batched revokes
+    outcome = cancel_tasks(db, *filters)
     db.commit()
     db.close()
 
-    return {"message": "Task cancelled successfully"}
+    revoked = revoke_messages(outcome["celery_ids"])
+
+    return {
+        "message": "Tasks cancelled",
+        "cancelled": len(outcome["cancelled"]),
+        "cancelling": len(outcome["cancelling"]),
+        "revoked": revoked
+    }
 
 
 # =========================================================
@@ -129,7 +225,7 @@ def download_report(
     if task.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not allowed")
 
-    report_path = f"reports/report_{task_id}.pdf"
+    report_path = os.path.join(settings.report_dir, f"report_{task_id}.pdf")
 
     if not os.path.exists(report_path):
         raise HTTPException(status_code=404, detail="Report not found")
@@ -145,7 +241,11 @@ def export_tasks_csv(
 ):
     db = SessionLocal()
     
-    tasks = db.query(Task).filter(
+    tasks = db.query(
+        Task.id, Task.task_type, Task.status, Task.created_at, Task.run_at, Task.completed_at,
+        Task.result, Task.result_blob, Task.result_size,
+        Task.error_message, Task.error_message_blob, Task.error_message_size
+    ).filter(
         Task.user_id == current_user.id
     ).order_by(Task.created_at.desc()).all()
     
@@ -165,8 +265,8 @@ def export_tasks_csv(
             t.created_at,
             t.run_at,
             t.completed_at or "",
-            t.result or "",
-            t.error_message or ""
+            inline_or_ref(t, "result") or "",
+            inline_or_ref(t, "error_message") or ""
         ])
         
     db.close()
@@ -178,4 +278,199 @@ def export_tasks_csv(
         io.BytesIO(output.getvalue().encode()),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=tasks_export.csv"}
-    )
\ No newline at end of file
+    )
+
+# =========================================================
+# ✅ 6. Offloaded Content (Protected, fetched lazily)
+# =========================================================
+BLOB_FIELDS = ["payload", "result", "error_message", "traceback"]
+
+
+@router.get("/tasks/{task_id}/blobs/{field}", response_model=TaskBlobResponse)
+def get_task_blob(
+    task_id: str,
+    field: str,
+    current_user=Depends(get_current_user)
+):
+    if field not in BLOB_FIELDS:
+        raise HTTPException(status_code=404, detail="Unknown field")
+
+    # Only the owner and the requested field, never the whole row (logs)
+    if field == "traceback":
+        columns = [Task.user_id, Task.traceback_blob]
+    else:
+        columns = [Task.user_id, getattr(Task, field), getattr(Task, f"{field}_blob")]
+
+    db = SessionLocal()
+    row = db.query(*columns).filter(Task.id == task_id).first()
+    db.close()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if row.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    if field == "traceback":
+        value = get_blob(row.traceback_blob) if row.traceback_blob else None
+    else:
+        value = field_value(field, row[1], row[2])
+
+    return {"task_id": task_id, "field": field, "value": value}
+
+
+# =========================================================
+# ✅ 7. Task Detail (Protected, cached + ETag)
+# =========================================================
+# Rows in these states never change again
+TERMINAL_STATUSES = ["SUCCESS", "FAILED", "CANCELLED", UPSTREAM_FAILED]
+
+LOG_LIMIT_DEFAULT = 16384
+LOG_LIMIT_MAX = 262144
+
+task_detail_cache = TTLCache(settings.task_detail_cache_ttl, settings.task_detail_cache_size)
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+# Everything the detail body changes with (payload, type, priority and
+# run_at are fixed at creation). The ETag is derived from these columns,
+# so an unchanged task is answered from one narrow query: no blob fetch,
+# no serialization, no logs transfer.
+LOG_TOTAL = func.coalesce(func.length(Task.logs), 0)
+
+VERSION_COLUMNS = [
+    Task.status, Task.retries, Task.started_at, Task.completed_at,
+    Task.result_blob, Task.result_size, Task.error_message_blob, Task.error_message_size,
+    Task.traceback_blob
+]
+
+
+def detail_etag(task_id, version, log_total, log_offset, log_limit):
+    key = repr((task_id, *version, log_total, log_offset, log_limit)).encode()
+    return '"' + hashlib.sha256(key).hexdigest()[:32] + '"'
+
+
+def load_task_version(task_id, log_offset, log_limit):
+    # -> (user_id, etag) or None
+    db = SessionLocal()
+    row = db.query(Task.user_id, LOG_TOTAL, *VERSION_COLUMNS).filter(Task.id == task_id).first()
+    db.close()
+
+    if not row:
+        return None
+
+    return row[0], detail_etag(task_id, row[2:], row[1], log_offset, log_limit)
+
+
+def load_task_detail(task_id, log_offset, log_limit):
+    # -> (terminal, etag, body) or None. Logs are sliced in SQL so a
+    # huge logs column never leaves the database whole.
+    if log_offset is None:
+        log_start = case((LOG_TOTAL > log_limit, LOG_TOTAL - log_limit + 1), else_=1)
+    else:
+        log_start = log_offset + 1
+
+    db = SessionLocal()
+
+    row = db.query(
+        Task,
+        LOG_TOTAL,
+        func.substr(Task.logs, log_start, log_limit)
+    ).options(defer(Task.logs)).filter(Task.id == task_id).first()
+
+    db.close()
+
+    if not row:
+        return None
+
+    t, total, logs = row
+    logs = logs or ""
+    offset = max(total - log_limit, 0) if log_offset is None else min(log_offset, total)
+
+    # From the row actually served (it may have moved on since the version check)
+    version = [getattr(t, column.key) for column in VERSION_COLUMNS]
+    etag = detail_etag(task_id, version, total, log_offset, log_limit)
+
+    body = {
+        "id": t.id,
+        "status": t.status,
+        "task_type": t.task_type,
+        "payload": get_field(t, "payload"),
+        "priority": t.priority,
+        "retries": t.retries,
+        "max_retries": t.max_retries,
+        "run_at": t.run_at,
+        "created_at": t.created_at,
+        "started_at": t.started_at,
+        "completed_at": t.completed_at,
+        "duration_s": (
+            (t.completed_at - t.started_at).total_seconds()
+            if t.started_at and t.completed_at else None
+        ),
+        "result": get_field(t, "result"),
+        "error_message": get_field(t, "error_message"),
+        "has_traceback": bool(t.traceback_blob),
+        "logs": logs,
+        "logs_offset": offset,
+        "logs_next_offset": offset + len(logs),
+        "logs_total": total
+    }
+
+    return t.status in TERMINAL_STATUSES, etag, body
+
+
+@router.get("/tasks/{task_id}", response_model=TaskDetailResponse)
+def get_task(
+    task_id: str,
+    request: Request,
+    log_offset: Optional[int] = Query(None, ge=0),
+    log_limit: int = Query(LOG_LIMIT_DEFAULT, ge=1, le=LOG_LIMIT_MAX),
+    current_user=Depends(get_current_user)
+):
+    cache_key = (task_id, log_offset, log_limit)
+    cached = task_detail_cache.get(cache_key)
+
+    if cached:
+        user_id, etag, content = cached
+    else:
+        # ✅ Version check only, the body is built if it changed
+        version = load_task_version(task_id, log_offset, log_limit)
+
+        if not version:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        user_id, etag = version
+        content = None
+
+    # ✅ Ownership Check (cached entries included)
+    if user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    # ✅ Unchanged since last poll -> empty 304
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if content is None:
+        loaded = load_task_detail(task_id, log_offset, log_limit)
+
+        if not loaded:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        terminal, etag, body = loaded
+        content = TaskDetailResponse(**body).model_dump_json().encode()
+        headers["ETag"] = etag
+
+        if terminal:
+            task_detail_cache.set(cache_key, (user_id, etag, content))
+
+    return Response(content, media_type="application/json", headers=headers)
@@ -0,0 +1,131 @@
+from fastapi import APIRouter, HTTPException, Depends
+from uuid import uuid4
+from datetime import datetime
+
+from app.database import SessionLocal
+from app.models import Task, WorkflowNode, TaskDependency
+from app.schemas import WorkflowCreate, WorkflowCreatedResponse, WorkflowResponse
+from app.workflows import add_node, find_cycle
+from app.blobstore import put_field
+from app.fairshare import PRIORITY_LEVELS
+
+from app.auth_dependency import get_current_user
+
+router = APIRouter(prefix="/workflows", tags=["Workflows"])
+
+
+# =========================================================
+# ✅ 1. Create Workflow (DAG of Tasks)
+# =========================================================
+@router.post("/", response_model=WorkflowCreatedResponse)
+def create_workflow(
+    data: WorkflowCreate,
+    current_user=Depends(get_current_user)
+):
+    edges = {t.key: list(dict.fromkeys(t.depends_on)) for t in data.tasks}
+
+    # -------------------------------
+    # Validate Graph
+    # -------------------------------
+    if not data.tasks:
+        raise HTTPException(status_code=400, detail="Workflow has no tasks")
+
+    if len(edges) != len(data.tasks):
+        raise HTTPException(status_code=400, detail="Task keys must be unique")
+
+    for key, parents in edges.items():
+        unknown = [p for p in parents if p not in edges]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Task '{key}' depends on unknown task '{unknown[0]}'")
+
+    for t in data.tasks:
+        if t.priority and t.priority not in PRIORITY_LEVELS:
+            raise HTTPException(status_code=400, detail=f"Priority must be one of {list(PRIORITY_LEVELS)}")
+
+    cycle_key = find_cycle(edges)
+    if cycle_key:
+        raise HTTPException(status_code=400, detail=f"Dependency cycle detected at task '{cycle_key}'")
+
+    # -------------------------------
+    # Create Tasks + Nodes + Edges (one transaction)
+    # -------------------------------
+    db = SessionLocal()
+
+    workflow_id = str(uuid4())
+    ids = {t.key: str(uuid4()) for t in data.tasks}
+    now = datetime.now()
+
+    for t in data.tasks:
+        task = Task(
+            id=ids[t.key],
+            status="SCHEDULED",
+            task_type=t.task_type,
+            retries=0,
+            run_at=datetime.strptime(t.run_at, "%Y-%m-%d %H:%M") if t.run_at else now,
+            priority=PRIORITY_LEVELS.get(t.priority),
+            user_id=current_user.id
+        )
+
+        put_field(task, "payload", t.payload)
+        add_node(db, task, workflow_id, [ids[p] for p in edges[t.key]])
+        db.add(task)
+
+    db.commit()
+    db.close()
+
+    return {
+        "message": "Workflow scheduled successfully!",
+        "workflow_id": workflow_id,
+        "tasks": ids
+    }
+
+
+# =========================================================
+# ✅ 2. Workflow Status (Only Owner)
+# =========================================================
+@router.get("/{workflow_id}", response_model=WorkflowResponse)
+def get_workflow(
+    workflow_id: str,
+    current_user=Depends(get_current_user)
+):
+    db = SessionLocal()
+
+    # Plain column rows, no ORM instances (logs / payload never loaded)
+    rows = db.query(
+        Task.id, Task.status, Task.task_type, Task.run_at, Task.completed_at,
+        Task.error_message, WorkflowNode.pending_deps
+    ).join(
+        WorkflowNode, WorkflowNode.task_id == Task.id
+    ).filter(
+        WorkflowNode.workflow_id == workflow_id,
+        Task.user_id == current_user.id
+    ).all()
+
+    if not rows:
+        db.close()
+        raise HTTPException(status_code=404, detail="Workflow not found")
+
+    task_ids = [r.id for r in rows]
+    deps = db.query(TaskDependency.task_id, TaskDependency.depends_on).filter(
+        TaskDependency.task_id.in_(task_ids)
+    ).all()
+
+    db.close()
+
+    parents = {}
+    for task_id, depends_on in deps:
+        parents.setdefault(task_id, []).append(depends_on)
+
+    counts = {}
+    for r in rows:
+        counts[r.status] = counts.get(r.status, 0) + 1
+
+    return {
+        "workflow_id": workflow_id,
+        "count": len(rows),
+        "status_counts": counts,
+        "tasks": [
+            {**r._mapping, "depends_on": parents.get(r.id, [])}
+            for r in rows
+        ]
+    }
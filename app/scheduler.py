@@ -1,8 +1,12 @@
 from datetime import datetime
+
+from sqlalchemy import update
+
 from app.database import SessionLocal
 from app.models import Task
 from app.tasks import execute_task
 from app.celery_app import celery
+from app.fairshare import select_fair_batch, DEFAULT_PRIORITY
 
 
 @celery.task
@@ -10,36 +14,47 @@ def check_scheduled_tasks():
     db = SessionLocal()
     now = datetime.now()
 
-    # ✅ Only scheduled tasks that are due
-    tasks = db.query(Task).filter(
-        Task.status == "SCHEDULED",
-        Task.run_at <= now
-    ).all()
+    # ✅ Due tasks, interleaved fairly across tenants (see app/fairshare.py)
+    batch = select_fair_batch(db, now)
+
+    if not batch:
+        db.close()
+        return
 
-    for task in tasks:
-        print("🚀 Dispatching scheduled task:", task.id)
+    # ✅ Claim all in one UPDATE (skips rows cancelled / claimed meanwhile)
+    claimed = dict(db.execute(
+        update(Task)
+        .where(Task.id.in_(batch), Task.status == "SCHEDULED")
+        .values(status="PENDING")
+        .returning(Task.id, Task.priority)
+        .execution_options(synchronize_session=False)
+    ).all())
+    db.commit()
 
-        # ✅ Mark Pending
-        task.status = "PENDING"
-        db.commit()
+    # -----------------------------
+    # ✅ Always Send to General Queue
+    # -----------------------------
+    queue_name = "celery"
 
-        # -----------------------------
-        # ✅ Always Send to General Queue
-        # -----------------------------
-        queue_name = "celery"
+    print(f"🚀 Dispatching {len(claimed)} scheduled task(s) to queue: {queue_name}")
 
-        print(f"📌 Sending task to queue: {queue_name}")
+    sent = []
+    for task_id in batch:
+        if task_id not in claimed:
+            continue
 
-        # ✅ Send to Celery General Worker
+        priority = claimed[task_id]
         res = execute_task.apply_async(
-            args=[task.id],
-            queue=queue_name
+            args=[task_id],
+            queue=queue_name,
+            priority=DEFAULT_PRIORITY if priority is None else priority
         )
+        sent.append({"id": task_id, "celery_task_id": res.id})
 
-        # ✅ Save celery task id
-        task.celery_task_id = res.id
-        db.commit()
+    # ✅ Save celery task ids (single executemany)
+    db.bulk_update_mappings(Task, sent)
+    db.commit()
 
-        print("✅ Celery Task ID Saved:", res.id)
+    print(f"✅ Celery Task IDs Saved: {len(sent)}")
 
-    db.close()
\ No newline at end of file
+    db.close()
@@ -1,17 +1,132 @@
 from pydantic import BaseModel
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
+from datetime import datetime
 
 
 class TaskCreate(BaseModel):
     run_at: str
     task_type: str
     payload: Any   # ✅ payload अब string भी हो सकता है, dict भी
+    depends_on: List[str] = []   # ✅ Parent task ids (must succeed first)
+    priority: Optional[str] = None   # ✅ high | normal | low
 
 
+# =====================================================
+# ✅ Task Responses
+# =====================================================
+# Used as response_model: FastAPI validates the returned rows (attribute
+# access, so plain column-select rows work) and writes JSON bytes in one
+# pass through pydantic-core, skipping jsonable_encoder + json.dumps.
 class TaskResponse(BaseModel):
     id: str
     status: str
     task_type: str
     payload: Any
+    payload_blob: Optional[str] = None
+    payload_size: Optional[int] = None
+    retries: Optional[int] = None
     result: Optional[str] = None
-    error_message: Optional[str] = None
\ No newline at end of file
+    result_blob: Optional[str] = None
+    error_message: Optional[str] = None
+    error_message_blob: Optional[str] = None
+    run_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    logs: Optional[str] = None
+
+
+class TaskListResponse(BaseModel):
+    count: int
+    tasks: List[TaskResponse]
+
+
+class TaskDetailResponse(BaseModel):
+    id: str
+    status: str
+    task_type: str
+    payload: Any
+    priority: Optional[int] = None
+    retries: Optional[int] = None
+    max_retries: Optional[int] = None
+    run_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    duration_s: Optional[float] = None
+    result: Optional[str] = None
+    error_message: Optional[str] = None
+    has_traceback: bool
+    logs: str
+    logs_offset: int
+    logs_next_offset: int
+    logs_total: int
+
+
+class TaskScheduledResponse(BaseModel):
+    message: str
+    task_id: str
+
+
+class MessageResponse(BaseModel):
+    message: str
+
+
+class BulkCancelResponse(BaseModel):
+    message: str
+    cancelled: int
+    cancelling: int
+    revoked: int
+
+
+class TaskBlobResponse(BaseModel):
+    task_id: str
+    field: str
+    value: Any
+
+
+class BulkCancelRequest(BaseModel):
+    # At least one filter, all given filters must match
+    ids: Optional[List[str]] = None
+    task_type: Optional[str] = None
+    run_at_from: Optional[str] = None   # "%Y-%m-%d %H:%M", inclusive
+    run_at_to: Optional[str] = None     # "%Y-%m-%d %H:%M", inclusive
+
+
+# =====================================================
+# ✅ Workflows
+# =====================================================
+class WorkflowTaskCreate(BaseModel):
+    key: str                     # Client-side name, unique within the workflow
+    task_type: str
+    payload: Any
+    run_at: Optional[str] = None   # Defaults to "as soon as parents succeed"
+    depends_on: List[str] = []     # Keys of other tasks in this workflow
+    priority: Optional[str] = None   # high | normal | low
+
+
+class WorkflowCreate(BaseModel):
+    tasks: List[WorkflowTaskCreate]
+
+
+class WorkflowCreatedResponse(BaseModel):
+    message: str
+    workflow_id: str
+    tasks: Dict[str, str]   # key -> task id
+
+
+class WorkflowTaskResponse(BaseModel):
+    id: str
+    status: str
+    task_type: str
+    depends_on: List[str] = []
+    pending_deps: Optional[int] = None
+    run_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    error_message: Optional[str] = None
+
+
+class WorkflowResponse(BaseModel):
+    workflow_id: str
+    count: int
+    status_counts: Dict[str, int]
+    tasks: List[WorkflowTaskResponse]
@@ -1,45 +1,84 @@
 from app.celery_app import celery
-from app.database import SessionLocal
+from app.database import session_scope
 from app.models import Task, ArchivedTask
+from app.workflows import release_dependents, fail_dependents
+from app.blobstore import field_values, field_value, put_blob
+from app.fairshare import DEFAULT_PRIORITY
+from app.cancellation import checkpoint, TaskCancelled, CANCELLING
 
+from sqlalchemy import func, update
+
+from app.config import settings
+
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import time
 import os
 import traceback
-import smtplib
-from email.message import EmailMessage
-
-from reportlab.pdfgen import canvas
-from dotenv import load_dotenv
 
 # =====================================================
-# ✅ Load ENV Properly
+# ✅ Config (read once, see app/config.py)
 # =====================================================
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ENV_PATH = os.path.join(BASE_DIR, "..", ".env")
-load_dotenv(ENV_PATH)
+# Handler deps (smtplib, reportlab) are imported on first use so
+# worker / beat / API startup doesn't pay for them.
+EMAIL_USER = settings.email_user
+EMAIL_PASS = settings.email_pass
 
-EMAIL_USER = os.getenv("EMAIL_USER")
-EMAIL_PASS = os.getenv("EMAIL_PASS")
+# Simulated processing delay per task (seconds), benchmarks set it to 0
+TASK_SIMULATED_DELAY = settings.task_simulated_delay
 
-# =====================================================
-# ✅ Reports Folder Setup
-# =====================================================
-REPORT_DIR = os.path.join(BASE_DIR, "..", "reports")
-os.makedirs(REPORT_DIR, exist_ok=True)
+REPORT_DIR = settings.report_dir
 
 
 # =====================================================
-# ✅ Log Helper Function
+# ✅ Buffered Run Log
 # =====================================================
-def add_log(task_row, db, message):
-    timestamp = datetime.utcnow().strftime("%H:%M:%S")
-
-    if not task_row.logs:
-        task_row.logs = ""
-
-    task_row.logs += f"[{timestamp}] {message}\n"
-    db.commit()
+# Handlers never hold a DB connection: log lines are kept in memory and
+# appended (SQL concat, the existing logs are never read back) by the
+# next short transaction, i.e. a checkpoint or the final status write.
+class TaskRun:
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.lines = []
+
+    def log(self, message):
+        timestamp = datetime.utcnow().strftime("%H:%M:%S")
+        self.lines.append(f"[{timestamp}] {message}\n")
+
+    @contextmanager
+    def transaction(self):
+        # Short transaction that also appends the buffered lines. They
+        # leave the buffer only once the commit succeeded: on a rollback
+        # (e.g. TaskCancelled at a checkpoint) the next write still has them.
+        with session_scope() as db:
+            yield db
+
+            written = len(self.lines)
+            if written:
+                db.execute(
+                    update(Task)
+                    .where(Task.id == self.task_id)
+                    .values(logs=func.coalesce(Task.logs, "") + "".join(self.lines[:written]))
+                    .execution_options(synchronize_session=False)
+                )
+
+        del self.lines[:written]
+
+    def checkpoint(self):
+        # Status is read first, on TaskCancelled nothing is written and
+        # finish_cancelled() appends the lines with the final status
+        with self.transaction() as db:
+            checkpoint(db, self.task_id)
+
+
+def set_task(db, task_id, **values):
+    db.execute(
+        update(Task)
+        .where(Task.id == task_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
 
 
 # =====================================================
@@ -47,6 +86,9 @@ def add_log(task_row, db, message):
 # =====================================================
 def send_email(to_email, subject, body):
 
+    import smtplib
+    from email.message import EmailMessage
+
     if not EMAIL_USER or not EMAIL_PASS:
         raise Exception("❌ EMAIL_USER or EMAIL_PASS missing in .env")
 
@@ -68,6 +110,9 @@ def send_email(to_email, subject, body):
 # ✅ PDF Generator Helper
 # =====================================================
 def generate_pdf_report(title, content, task_id):
+    from reportlab.pdfgen import canvas
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
 
     filename = f"report_{task_id}.pdf"
     filepath = os.path.join(REPORT_DIR, filename)
@@ -85,16 +130,126 @@ def generate_pdf_report(title, content, task_id):
     return filepath
 
 
+# =====================================================
+# ✅ Workflow Fan-out Helper
+# =====================================================
+def dispatch_ready(children):
+    # Children released by a finished parent (already claimed as PENDING),
+    # sent after the finalize transaction committed
+    sent = []
+
+    for child_id, priority in children:
+        res = execute_task.apply_async(
+            args=[child_id],
+            queue="celery",
+            priority=DEFAULT_PRIORITY if priority is None else priority
+        )
+        sent.append({"id": child_id, "celery_task_id": res.id})
+
+    with session_scope() as db:
+        db.bulk_update_mappings(Task, sent)
+
+
+# =====================================================
+# ✅ Task Handlers (no DB connection held)
+# =====================================================
+def run_handler(run, task_id, task_type, payload):
+
+    # =====================================================
+    # ✅ SEND MESSAGE TASK
+    # =====================================================
+    if task_type == "send_message":
+        run.log("📩 Sending Message...")
+        result = f"Message sent: {payload}"
+        run.log("✅ Message Delivered Successfully")
+
+    # =====================================================
+    # ✅ SEND EMAIL TASK (REAL FIXED)
+    # =====================================================
+    elif task_type == "send_email":
+
+        run.log("📧 Email Task Triggered")
+
+        # ✅ Extract Payload Values
+        to_email = payload.get("to")
+        subject = payload.get("subject", "Task Scheduler Email")
+
+        # ✅ FIX: Body should come from "body" or "content"
+        body = payload.get("content") or payload.get("body", "Hello from Task Scheduler!")
+        if not to_email:
+            raise Exception("❌ Recipient email missing in payload")
+
+        run.log(f"📨 Sending Email To: {to_email}")
+        run.log(f"📝 Subject: {subject}")
+        preview = str(body)
+        run.log(f"📄 Body: {preview[:200]}{'…' if len(preview) > 200 else ''}")
+
+        # 🛑 Last chance to stop before external I/O
+        run.checkpoint()
+
+        # ✅ Send Actual Email
+        send_email(to_email, subject, body)
+
+        result = f"✅ Email sent successfully to {to_email}"
+        run.log("✅ Email Sent Successfully")
+
+    # =====================================================
+    # ✅ GENERATE PDF REPORT TASK
+    # =====================================================
+    elif task_type == "generate_report":
+
+        run.log("📄 Generating PDF Report...")
+
+        title = payload.get("title", "Task Report")
+        content = payload.get("content", "No content provided")
+
+        run.checkpoint()
+
+        filepath = generate_pdf_report(title, content, task_id)
+
+        result = f"PDF Report Generated: {filepath}"
+        run.log(f"✅ Report Saved at {filepath}")
+
+    # =====================================================
+    # ❌ UNKNOWN TASK
+    # =====================================================
+    else:
+        run.log("⚠️ Unknown Task Type Received")
+        result = "Unknown task type"
+
+    # Simulate Processing Delay
+    time.sleep(TASK_SIMULATED_DELAY)
+
+    # No checkpoint from here on: the side effect already happened, so a
+    # late cancel can't undo it (finish_success records that instead)
+    return result
+
+
 # =====================================================
 # ✅ Main Task Executor
 # =====================================================
+# Three phases, each its own short transaction so a worker only holds a
+# pooled connection for milliseconds, never across SMTP / PDF / sleep:
+#   1. claim    - mark RUNNING, read what the handler needs
+#   2. run      - handler I/O with no connection (checkpoints are tiny
+#                 transactions of their own)
+#   3. finalize - status + result + logs + dependents in one commit
+# Nothing relies on session-level state, so this works unchanged behind
+# PgBouncer in transaction pooling mode.
 @celery.task(bind=True)
 def execute_task(self, task_id):
 
-    db = SessionLocal()
-    task_row = db.query(Task).filter(Task.id == task_id).first()
+    run = TaskRun(task_id)
+
+    # =====================================================
+    # 1️⃣ CLAIM
+    # =====================================================
+    with run.transaction() as db:
+        task_row = db.query(
+            Task.status, Task.task_type, Task.retries, Task.max_retries,
+            Task.payload, Task.payload_blob
+        ).filter(Task.id == task_id).first()
 
-    try:
         # -------------------------------
         # Task Not Found
         # -------------------------------
@@ -108,131 +263,131 @@ def execute_task(self, task_id):
             return {"status": "CANCELLED"}
 
         # -------------------------------
-        # Mark Running
+        # Mark Running (only if not cancelled meanwhile)
         # -------------------------------
-        task_row.status = "RUNNING"
-        # Only set started_at if it's the first run (or if you want to track latest run)
-        if not task_row.started_at: 
-             task_row.started_at = datetime.utcnow()
-        
-        db.commit()
+        # started_at is kept from the first try
+        claimed = db.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.status.notin_(["CANCELLED", CANCELLING]))
+            .values(status="RUNNING", started_at=func.coalesce(Task.started_at, datetime.utcnow()))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        if claimed:
+            run.log(f"🚀 Task Started (type={task_row.task_type}) [Try {task_row.retries + 1}/{task_row.max_retries + 1}]")
+
+    if not claimed:
+        return finish_cancelled(run)
+
+    # =====================================================
+    # 2️⃣ RUN (no connection held)
+    # =====================================================
+    try:
+        # Offloaded payloads are fetched from the blob store here only
+        payload = field_value("payload", task_row.payload, task_row.payload_blob)
 
-        add_log(task_row, db, f"🚀 Task Started (type={task_row.task_type}) [Try {task_row.retries + 1}/{task_row.max_retries + 1}]")
+        result = run_handler(run, task_id, task_row.task_type, payload)
 
-        payload = task_row.payload
+    except TaskCancelled:
+        return finish_cancelled(run)
 
-        # =====================================================
-        # ✅ SEND MESSAGE TASK
-        # =====================================================
-        if task_row.task_type == "send_message":
-            add_log(task_row, db, "📩 Sending Message...")
+    except Exception as exc:
+        return finish_failed(self, run, task_row, exc)
 
-            task_row.result = f"Message sent: {payload}"
+    # =====================================================
+    # 3️⃣ FINALIZE
+    # =====================================================
+    return finish_success(run, result)
 
-            add_log(task_row, db, "✅ Message Delivered Successfully")
 
-        # =====================================================
-        # ✅ SEND EMAIL TASK (REAL FIXED)
-        # =====================================================
-        elif task_row.task_type == "send_email":
+# -------------------------------
+# ✅ SUCCESS
+# -------------------------------
+def finish_success(run, result):
+    # Blob upload (if any) happens before the transaction opens
+    values = field_values("result", result)
 
-            add_log(task_row, db, "📧 Email Task Triggered")
+    with run.transaction() as db:
+        status = db.query(Task.status).filter(Task.id == run.task_id).scalar()
+        if status == CANCELLING:
+            run.log("🛑 Cancel arrived after the task's side effect, finishing as SUCCESS")
 
-            # ✅ Extract Payload Values
-            to_email = payload.get("to")
-            subject = payload.get("subject", "Task Scheduler Email")
+        set_task(db, run.task_id, status="SUCCESS", completed_at=datetime.utcnow(), **values)
 
-            # ✅ FIX: Body should come from "body" or "content"
-            body = payload.get("content") or payload.get("body", "Hello from Task Scheduler!")
-            if not to_email:
-                raise Exception("❌ Recipient email missing in payload")
+        # ✅ Fan-in: unblock children whose last parent this was
+        ready = release_dependents(db, run.task_id)
 
-            add_log(task_row, db, f"📨 Sending Email To: {to_email}")
-            add_log(task_row, db, f"📝 Subject: {subject}")
-            add_log(task_row, db, f"📄 Body: {body}")
+        # Final log lines land in the same commit as the terminal status
+        run.log("🎉 Task Finished Successfully")
+        if ready:
+            run.log(f"🔗 Released {len(ready)} dependent task(s)")
 
-            # ✅ Send Actual Email
-            send_email(to_email, subject, body)
+    if ready:
+        dispatch_ready(ready)
 
-            task_row.result = f"✅ Email sent successfully to {to_email}"
-            add_log(task_row, db, "✅ Email Sent Successfully")
+    return {"status": "DONE"}
 
-        # =====================================================
-        # ✅ GENERATE PDF REPORT TASK
-        # =====================================================
-        elif task_row.task_type == "generate_report":
 
-            add_log(task_row, db, "📄 Generating PDF Report...")
+# -------------------------------
+# 🛑 CANCELLED (before start or at a checkpoint)
+# -------------------------------
+def finish_cancelled(run):
+    run.log("🛑 Task Cancelled")
 
-            title = payload.get("title", "Task Report")
-            content = payload.get("content", "No content provided")
+    with run.transaction() as db:
+        set_task(db, run.task_id, status="CANCELLED", completed_at=datetime.utcnow())
+        fail_dependents(db, run.task_id)
 
-            filepath = generate_pdf_report(title, content, task_id)
+    return {"status": "CANCELLED"}
 
-            task_row.result = f"PDF Report Generated: {filepath}"
-            add_log(task_row, db, f"✅ Report Saved at {filepath}")
 
-        # =====================================================
-        # ❌ UNKNOWN TASK
-        # =====================================================
-        else:
-            add_log(task_row, db, "⚠️ Unknown Task Type Received")
-            task_row.result = "Unknown task type"
+def finish_failed(task, run, task_row, exc):
+    values = field_values("error_message", str(exc))
 
-        # Simulate Processing Delay
-        time.sleep(2)
+    # -------------------------------
+    # 🔄 RETRY LOGIC
+    # -------------------------------
+    if task_row.retries < task_row.max_retries:
+        attempt = task_row.retries + 1
 
-        # -------------------------------
-        # Mark Success
-        # -------------------------------
-        task_row.status = "SUCCESS"
-        task_row.completed_at = datetime.utcnow()
-        db.commit()
+        run.log(f"⚠️ Task Failed: {str(exc)}")
 
-        add_log(task_row, db, "🎉 Task Finished Successfully")
+        # A pending cancel wins over the retry (RETRYING would hide it
+        # from the next claim)
+        with run.transaction() as db:
+            retried = db.execute(
+                update(Task)
+                .where(Task.id == run.task_id, Task.status != CANCELLING)
+                .values(status="RETRYING", retries=attempt, **values)
+                .execution_options(synchronize_session=False)
+            ).rowcount
 
-        return {"status": "DONE"}
+            if retried:
+                run.log(f"🔄 Retrying... (Attempt {attempt}/{task_row.max_retries})")
 
-    except Exception as exc:
-        
-        # -------------------------------
-        # 🔄 RETRY LOGIC
-        # -------------------------------
-        # Check if we should retry
-        if task_row.retries < task_row.max_retries:
-            task_row.retries += 1
-            task_row.status = "RETRYING"
-            task_row.error_message = str(exc)
-            
-            # Log the retry
-            add_log(task_row, db, f"⚠️ Task Failed: {str(exc)}")
-            add_log(task_row, db, f"🔄 Retrying... (Attempt {task_row.retries}/{task_row.max_retries})")
-            db.commit()
-
-            # Retry Delay (Exponential Backoff could be used here, simple 5s for now)
-            # We use self.retry which raises a Retry exception, breaking flow
-            try:
-                # Close DB before retry raises exception
-                db.close() 
-                raise self.retry(exc=exc, countdown=5)
-            except Exception as retry_exc:
-                # If retry check failed specifically (e.g. MaxRetriesExceededError from celery itself, 
-                # though we checked manually above)
-                # Just re-raise to let the outer block handle final failure if needed
-                # But self.retry actually raises a special exception that Celery catches.
-                raise retry_exc
+        if not retried:
+            return finish_cancelled(run)
 
-        # -------------------------------
-        # ❌ FINAL FAILURE
-        # -------------------------------
-        task_row.status = "FAILED"
-        task_row.error_message = str(exc)
-        db.commit()
+        # Retry Delay (Exponential Backoff could be used here, simple 5s for now)
+        # self.retry raises a Retry exception that Celery catches
+        raise task.retry(exc=exc, countdown=5)
+
+    # -------------------------------
+    # ❌ FINAL FAILURE
+    # -------------------------------
+    tb = traceback.format_exc()
+
+    # Big tracebacks go to the blob store, logs keep a pointer
+    if len(tb.encode()) > settings.blob_threshold_bytes:
+        values["traceback_blob"], tb_size = put_blob(tb)
+        run.log(f"❌ Task Failed Permanently: {str(exc)[:200]} (traceback offloaded, {tb_size} bytes)")
+    else:
+        run.log(f"❌ Task Failed Permanently:\n{tb}")
 
-        tb = traceback.format_exc()
-        add_log(task_row, db, f"❌ Task Failed Permanently:\n{tb}")
+    with run.transaction() as db:
+        set_task(db, run.task_id, status="FAILED", **values)
 
-        return {"status": "FAILED", "error": str(exc)}
+        # ✅ Dependents can never run now
+        fail_dependents(db, run.task_id)
 
-    finally:
-        db.close()
\ No newline at end of file
+    return {"status": "FAILED", "error": str(exc)}
@@ -0,0 +1,147 @@
+from datetime import datetime
+
+from sqlalchemy import select, update, func
+
+from app.models import Task, WorkflowNode, TaskDependency
+from app.fairshare import DEFAULT_PRIORITY, tenant_weights, free_slots
+
+# Task is blocked on parents that haven't succeeded yet
+WAITING = "WAITING"
+# A parent failed / was cancelled, the task will never run
+UPSTREAM_FAILED = "UPSTREAM_FAILED"
+
+
+# =====================================================
+# ✅ Graph Validation
+# =====================================================
+def find_cycle(edges):
+    # edges: {key: [parent keys]} -> a key on a cycle, or None (Kahn's algorithm)
+    pending = {key: len(parents) for key, parents in edges.items()}
+    children = {key: [] for key in edges}
+
+    for key, parents in edges.items():
+        for parent in parents:
+            children[parent].append(key)
+
+    ready = [key for key, count in pending.items() if count == 0]
+
+    while ready:
+        key = ready.pop()
+        for child in children[key]:
+            pending[child] -= 1
+            if pending[child] == 0:
+                ready.append(child)
+
+    stuck = [key for key, count in pending.items() if count > 0]
+    return stuck[0] if stuck else None
+
+
+# =====================================================
+# ✅ Graph Construction
+# =====================================================
+def add_node(db, task, workflow_id, parent_ids, pending_deps=None):
+    # Registers task in the workflow graph, WAITING until parents succeed
+    pending_deps = len(parent_ids) if pending_deps is None else pending_deps
+
+    db.add(WorkflowNode(task_id=task.id, workflow_id=workflow_id, pending_deps=pending_deps))
+
+    for parent_id in parent_ids:
+        db.add(TaskDependency(task_id=task.id, depends_on=parent_id))
+
+    if pending_deps > 0:
+        task.status = WAITING
+
+
+# =====================================================
+# ✅ Fan-in: Release Dependents
+# =====================================================
+def release_dependents(db, task_id):
+    # Called once task_id SUCCEEDED. Decrements every child's counter in
+    # one indexed UPDATE, flips children that hit 0 to SCHEDULED and
+    # claims the ones already due (PENDING) so the caller can dispatch
+    # them right away instead of waiting for the next beat tick. Claims
+    # count against the owner's in-flight cap like beat dispatches do,
+    # children over it stay SCHEDULED for the beat.
+    # Returns [(task_id, priority)] of the claimed children.
+    children = select(TaskDependency.task_id).where(TaskDependency.depends_on == task_id)
+
+    counters = db.execute(
+        update(WorkflowNode)
+        .where(WorkflowNode.task_id.in_(children))
+        .values(pending_deps=WorkflowNode.pending_deps - 1)
+        .returning(WorkflowNode.task_id, WorkflowNode.pending_deps)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    ready = [child_id for child_id, pending in counters if pending == 0]
+    if not ready:
+        return []
+
+    db.execute(
+        update(Task)
+        .where(Task.id.in_(ready), Task.status == WAITING)
+        .values(status="SCHEDULED")
+        .execution_options(synchronize_session=False)
+    )
+
+    # Children share the parent's owner
+    owner = db.execute(select(Task.user_id).where(Task.id == task_id)).scalar()
+    limit = None
+    if owner is not None:
+        limit = free_slots(db, tenant_weights(db, [owner]) or {owner: 1}).get(owner)
+
+    if limit == 0:
+        return []
+
+    due = select(Task.id).where(
+        Task.id.in_(ready), Task.status == "SCHEDULED", Task.run_at <= datetime.now()
+    ).order_by(func.coalesce(Task.priority, DEFAULT_PRIORITY), Task.run_at)
+
+    if limit is not None:
+        due = due.limit(limit)
+
+    return db.execute(
+        update(Task)
+        .where(Task.id.in_(due), Task.status == "SCHEDULED")
+        .values(status="PENDING")
+        .returning(Task.id, Task.priority)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+# =====================================================
+# ❌ Failure Propagation
+# =====================================================
+def fail_dependents(db, task_ids, status=UPSTREAM_FAILED):
+    # Marks every WAITING descendant of task_ids (recursive CTE over edges)
+    if isinstance(task_ids, str):
+        task_ids = [task_ids]
+
+    if not task_ids:
+        return 0
+
+    descendants = (
+        select(TaskDependency.task_id)
+        .where(TaskDependency.depends_on.in_(task_ids))
+        .cte("descendants", recursive=True)
+    )
+    descendants = descendants.union(
+        select(TaskDependency.task_id)
+        .join(descendants, TaskDependency.depends_on == descendants.c.task_id)
+    )
+
+    result = db.execute(
+        update(Task)
+        .where(Task.id.in_(select(descendants.c.task_id)), Task.status == WAITING)
+        .values(
+            status=status,
+            error_message=(
+                f"Upstream task {task_ids[0]} did not succeed" if len(task_ids) == 1
+                else "Upstream tasks did not succeed"
+            ),
+            completed_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    return result.rowcount
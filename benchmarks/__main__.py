@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.harness import Harness, DEFAULT_DATABASE_URL
+from benchmarks.workloads import WORKLOADS, parse_mix
+from benchmarks.importtime import run_importtime
+from benchmarks.serialization import run_serialization
+
+
+# =====================================================
+# ✅ Run
+# =====================================================
+def run_workload(name, args):
+    params = {
+        key: getattr(args, key)
+        for key in ("tasks", "users", "polls", "log_kb", "payload_kb", "seed", "workers", "io_delay")
+        if getattr(args, key) is not None
+    }
+    if args.mix:
+        params["mix"] = parse_mix(args.mix)
+
+    h = Harness(args.database_url, args.handler_delay, args.db_pool_size)
+
+    try:
+        start = time.perf_counter()
+        extra = WORKLOADS[name](h, **params) or {}
+        wall = time.perf_counter() - start
+
+        return {
+            "workload": name,
+            "params": params,
+            "database": h.engine.dialect.name,
+            "handler_delay": args.handler_delay,
+            "db_pool_size": args.db_pool_size,
+            "created_at": datetime.utcnow().isoformat(),
+            **h.metrics.report(wall),
+            **extra,
+        }
+    finally:
+        h.close()
+
+
+def cmd_run(args):
+    names = list(WORKLOADS) if args.workload == "all" else [args.workload]
+    os.makedirs(args.out, exist_ok=True)
+
+    for name in names:
+        result = run_workload(name, args)
+
+        path = os.path.join(args.out, f"{name}.json")
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+
+        print(f"📊 {name}: {result['tasks_completed']} tasks, "
+              f"lag p95={result['lag_ms']['p95']} ms -> {path}")
+
+        for group, lag in result.get("tenant_lag_ms", {}).items():
+            print(f"   {group} tenants lag p50={lag['p50']} ms p95={lag['p95']} ms")
+
+        limit = result.get("connection_limit")
+        if limit:
+            print(f"   {limit['workers']} workers on {limit['max_connections']} connections: "
+                  f"~{limit['effective_concurrency']} tasks in flight, peak {limit['connections_peak']} connections")
+
+        for op, stats in result["operations"].items():
+            print(f"   {op:<24} calls={stats['calls']:<6} "
+                  f"p95={stats['latency_ms']['p95']} ms "
+                  f"queries/call={stats['queries_per_call']}")
+
+    return 0
+
+
+# =====================================================
+# ✅ Compare (CI regression gate)
+# =====================================================
+def load_results(path):
+    if os.path.isdir(path):
+        results = {}
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".json"):
+                with open(os.path.join(path, name)) as f:
+                    data = json.load(f)
+                results[data["workload"]] = data
+        return results
+
+    with open(path) as f:
+        data = json.load(f)
+    return {data["workload"]: data}
+
+
+def compare_results(baseline, current, tolerance):
+    regressions = []
+
+    def worse(label, old, new, higher_is_worse=True, slack=tolerance):
+        if old is None or new is None:
+            return
+        limit = old * (1 + slack) if higher_is_worse else old * (1 - slack)
+        if (new > limit) if higher_is_worse else (new < limit):
+            regressions.append(f"{label}: {old} -> {new}")
+
+    for workload, cur in current.items():
+        base = baseline.get(workload)
+        if not base or "operations" not in cur:
+            continue
+
+        worse(f"{workload} lag p95 ms", base["lag_ms"]["p95"], cur["lag_ms"]["p95"])
+
+        for group, lag in cur.get("tenant_lag_ms", {}).items():
+            old = base.get("tenant_lag_ms", {}).get(group)
+            if old:
+                worse(f"{workload} {group} tenant lag p95 ms", old["p95"], lag["p95"])
+
+        for op, stats in cur["operations"].items():
+            old = base["operations"].get(op)
+            if not old:
+                continue
+
+            # Query counts are deterministic, any increase is a regression
+            worse(f"{workload} {op} queries/call", old["queries_per_call"], stats["queries_per_call"], slack=0)
+            worse(f"{workload} {op} p95 ms", old["latency_ms"]["p95"], stats["latency_ms"]["p95"])
+            worse(f"{workload} {op} throughput/s", old["throughput_per_s"], stats["throughput_per_s"], higher_is_worse=False)
+
+    return regressions
+
+
+def cmd_compare(args):
+    regressions = compare_results(
+        load_results(args.baseline),
+        load_results(args.current),
+        args.tolerance,
+    )
+
+    if regressions:
+        print("❌ Performance regressions detected:")
+        for line in regressions:
+            print("   " + line)
+        return 1
+
+    print("✅ No regressions")
+    return 0
+
+
+# =====================================================
+# ✅ Import Time (cold start budget)
+# =====================================================
+def cmd_importtime(args):
+    result = run_importtime({"api": args.budget_api_ms, "worker": args.budget_worker_ms}, args.repeat)
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, "importtime.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+
+    for name, stats in result["targets"].items():
+        print(f"⏱️  {name:<8} cold start={stats['wall_ms']} ms (budget {stats['budget_ms']} ms), "
+              f"imports={stats['import_ms']} ms, modules={stats['modules_imported']}")
+
+    if result["violations"]:
+        print("❌ Startup budget exceeded:")
+        for line in result["violations"]:
+            print("   " + line)
+        return 1
+
+    print(f"✅ Within budget -> {path}")
+    return 0
+
+
+# =====================================================
+# ✅ Serialization (GET /tasks/ cost per N tasks)
+# =====================================================
+def cmd_serialization(args):
+    result = run_serialization(args.tasks, args.repeat)
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, "serialization.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+
+    for name, stats in result["paths"].items():
+        print(f"🧾 {name:<8} {result['tasks']} tasks: hydrate={stats['hydrate_ms']} ms "
+              f"serialize={stats['serialize_ms']} ms total={stats['total_ms']} ms ({stats['bytes']} bytes)")
+
+    print(f"✅ typed path {result['speedup']}x faster -> {path}")
+    return 0
+
+
+# =====================================================
+# ✅ CLI
+# =====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run a workload and save JSON results")
+    run.add_argument("workload", choices=["all", *WORKLOADS])
+    run.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", DEFAULT_DATABASE_URL))
+    run.add_argument("--handler-delay", type=float, default=0.0, help="Simulated per-task delay (s)")
+    run.add_argument("--tasks", type=int)
+    run.add_argument("--users", type=int)
+    run.add_argument("--polls", type=int)
+    run.add_argument("--log-kb", type=int)
+    run.add_argument("--payload-kb", type=int)
+    run.add_argument("--mix", help="e.g. send_message=90,send_email=9,generate_report=1")
+    run.add_argument("--seed", type=int)
+    run.add_argument("--workers", type=int, help="Concurrent worker threads (connection_limit)")
+    run.add_argument("--io-delay", type=float, help="Handler I/O time per task in s (connection_limit)")
+    run.add_argument("--db-pool-size", type=int, help="Pin the connection pool (no overflow)")
+    run.add_argument("--out", default="bench-results")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="Fail if current results regress from baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--tolerance", type=float, default=0.25)
+    compare.set_defaults(func=cmd_compare)
+
+    importtime = sub.add_parser("importtime", help="Check API / worker cold start against a budget")
+    importtime.add_argument("--budget-api-ms", type=float, default=1000)
+    importtime.add_argument("--budget-worker-ms", type=float, default=1000)
+    importtime.add_argument("--repeat", type=int, default=5)
+    importtime.add_argument("--out", default="bench-results")
+    importtime.set_defaults(func=cmd_importtime)
+
+    serialization = sub.add_parser("serialization", help="Time GET /tasks/ hydration + JSON encoding")
+    serialization.add_argument("--tasks", type=int, default=10000)
+    serialization.add_argument("--repeat", type=int, default=5)
+    serialization.add_argument("--out", default="bench-results")
+    serialization.set_defaults(func=cmd_serialization)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
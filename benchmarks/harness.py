@@ -0,0 +1,412 @@
+import os
+import math
+import time
+import uuid
+import queue
+import threading
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from unittest import mock
+
+
+# =====================================================
+# ✅ Environment (must be applied before importing app.*)
+# =====================================================
+DEFAULT_DATABASE_URL = "sqlite:///./bench.db"
+
+
+def configure_env(database_url, handler_delay=0.0, db_pool_size=None):
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["TASK_SIMULATED_DELAY"] = str(handler_delay)
+
+    if db_pool_size:
+        # Fixed connection budget, like a Postgres max_connections share
+        os.environ["DB_POOL_SIZE"] = str(db_pool_size)
+        os.environ["DB_MAX_OVERFLOW"] = "0"
+    os.environ.setdefault("BLOB_DIR", os.path.abspath("bench-blobs"))
+    # generate_report PDFs, kept out of the tracked reports/ dir
+    os.environ.setdefault("REPORT_DIR", os.path.abspath("bench-reports"))
+
+    # Dummy SMTP credentials, the SMTP client itself is stubbed below
+    os.environ.setdefault("EMAIL_USER", "bench@bench.local")
+    os.environ.setdefault("EMAIL_PASS", "bench")
+
+
+# =====================================================
+# ✅ Stubs: SMTP + Broker
+# =====================================================
+class StubSMTP:
+    sent = 0
+    # Simulated SMTP round trip (s), see the connection_limit workload
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, msg):
+        if self.latency:
+            time.sleep(self.latency)
+        StubSMTP.sent += 1
+
+
+class StubResult:
+    def __init__(self, id):
+        self.id = id
+
+
+class StandInBroker:
+    # Records every apply_async() call instead of pushing to Redis,
+    # the harness then plays the worker by draining it in order.
+
+    def __init__(self):
+        self.messages = []
+        self.revoked = set()
+
+    def send(self, args=None, kwargs=None, **options):
+        message_id = str(uuid.uuid4())
+        self.messages.append({
+            "id": message_id,
+            "args": list(args or []),
+            "options": options,
+            "sent_at": time.perf_counter(),
+        })
+        return StubResult(message_id)
+
+    def revoke(self, task_ids, **kwargs):
+        # Workers discard revoked messages, so drop them from the queue
+        task_ids = {task_ids} if isinstance(task_ids, str) else set(task_ids)
+        self.revoked.update(task_ids)
+        self.messages = [m for m in self.messages if m["id"] not in task_ids]
+
+    def pop(self, limit=None):
+        # Redis priority queues serve priority 0 first, FIFO within a level
+        self.messages.sort(key=lambda m: m["options"].get("priority", 0))
+        limit = len(self.messages) if limit is None else limit
+        messages, self.messages = self.messages[:limit], self.messages[limit:]
+        return messages
+
+
+# =====================================================
+# ✅ Metrics
+# =====================================================
+_current_op = contextvars.ContextVar("bench_current_op", default=None)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_ms(values):
+    return {
+        "p50": _ms(percentile(values, 50)),
+        "p95": _ms(percentile(values, 95)),
+        "p99": _ms(percentile(values, 99)),
+        "max": _ms(max(values) if values else None),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+class Metrics:
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.queries = defaultdict(int)
+        self.scheduled_at = {}
+        self.completed_at = {}
+        self.task_owner = {}
+        self.connections_in_use = 0
+        self.connections_peak = 0
+        self._lock = threading.Lock()
+
+    def on_checkout(self, *args):
+        with self._lock:
+            self.connections_in_use += 1
+            self.connections_peak = max(self.connections_peak, self.connections_in_use)
+
+    def on_checkin(self, *args):
+        with self._lock:
+            self.connections_in_use -= 1
+
+    def on_query(self, *args, **kwargs):
+        op = _current_op.get()
+        if op:
+            self.queries[op] += 1
+
+    @contextmanager
+    def measure(self, op):
+        token = _current_op.set(op)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[op].append(time.perf_counter() - start)
+            _current_op.reset(token)
+
+    def lags(self, user_ids=None):
+        return [
+            self.completed_at[task_id] - self.scheduled_at[task_id]
+            for task_id in self.completed_at
+            if task_id in self.scheduled_at
+            and (user_ids is None or self.task_owner.get(task_id) in user_ids)
+        ]
+
+    def report(self, wall_seconds):
+        operations = {}
+
+        for op, durations in self.durations.items():
+            total = sum(durations)
+            operations[op] = {
+                "calls": len(durations),
+                "total_s": round(total, 4),
+                "throughput_per_s": round(len(durations) / total, 2) if total else None,
+                "latency_ms": summarize_ms(durations),
+                "queries": self.queries[op],
+                "queries_per_call": round(self.queries[op] / len(durations), 2),
+            }
+
+        completed = len(self.completed_at)
+
+        return {
+            "operations": operations,
+            "tasks_completed": completed,
+            "task_throughput_per_s": round(completed / wall_seconds, 2) if wall_seconds else None,
+            "lag_ms": summarize_ms(self.lags()),
+            "connections_peak": self.connections_peak,
+            "wall_s": round(wall_seconds, 4),
+        }
+
+
+def _sqlite_fast_pragmas(dbapi_conn, conn_record):
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+# =====================================================
+# ✅ Harness
+# =====================================================
+class Harness:
+    # Drives the real entry points: the FastAPI app via TestClient,
+    # check_scheduled_tasks() directly and execute_task via Celery's
+    # local apply() (the stand-in broker replaces Redis).
+
+    def __init__(self, database_url=DEFAULT_DATABASE_URL, handler_delay=0.0, db_pool_size=None):
+        configure_env(database_url, handler_delay, db_pool_size)
+
+        from fastapi.testclient import TestClient
+        from sqlalchemy import event
+
+        from app.main import app
+        from app.migrate import migrate
+        from app.database import engine, SessionLocal
+        from app import tasks as task_module
+        from app import scheduler as scheduler_module
+        from app.celery_app import celery
+
+        self.engine = engine
+        self.SessionLocal = SessionLocal
+        self.tasks = task_module
+        self.scheduler = scheduler_module
+        self.client = TestClient(app)
+
+        self.run_id = uuid.uuid4().hex[:8]
+        self.metrics = Metrics()
+        self.broker = StandInBroker()
+        self.users = []
+
+        if engine.dialect.name == "sqlite":
+            # Stand-in only: don't let fsync per commit dominate the numbers
+            event.listen(engine, "connect", _sqlite_fast_pragmas)
+
+        event.listen(engine, "before_cursor_execute", self.metrics.on_query)
+        event.listen(engine, "checkout", self.metrics.on_checkout)
+        event.listen(engine, "checkin", self.metrics.on_checkin)
+
+        migrate()
+
+        self._patches = [
+            mock.patch("smtplib.SMTP_SSL", StubSMTP),
+            mock.patch.object(task_module.execute_task, "apply_async", self.broker.send),
+            mock.patch.object(celery.control, "revoke", self.broker.revoke),
+        ]
+        for patch in self._patches:
+            patch.start()
+
+    def close(self):
+        from sqlalchemy import event
+
+        for patch in reversed(self._patches):
+            patch.stop()
+
+        event.remove(self.engine, "before_cursor_execute", self.metrics.on_query)
+        event.remove(self.engine, "checkout", self.metrics.on_checkout)
+        event.remove(self.engine, "checkin", self.metrics.on_checkin)
+
+        self.cleanup()
+        self.client.close()
+
+    # -------------------------------
+    # Users
+    # -------------------------------
+    def create_users(self, count):
+        from app.models_user import User
+        from app.auth_utils import create_access_token
+
+        db = self.SessionLocal()
+        created = []
+
+        for i in range(count):
+            user = User(
+                id=str(uuid.uuid4()),
+                email=f"bench-{self.run_id}-{len(self.users) + i}@bench.local",
+                hashed_password="!",
+            )
+            db.add(user)
+            created.append({
+                "id": user.id,
+                "headers": {"Authorization": f"Bearer {create_access_token({'sub': user.id})}"},
+            })
+
+        db.commit()
+        db.close()
+
+        self.users.extend(created)
+        return created
+
+    def cleanup(self):
+        from sqlalchemy import select
+
+        from app.models import Task, WorkflowNode, TaskDependency
+        from app.models_user import User
+
+        user_ids = [u["id"] for u in self.users]
+        if not user_ids:
+            return
+
+        db = self.SessionLocal()
+        task_ids = select(Task.id).where(Task.user_id.in_(user_ids))
+
+        # Graph rows first, they reference the tasks by id
+        db.query(TaskDependency).filter(TaskDependency.task_id.in_(task_ids)).delete(synchronize_session=False)
+        db.query(WorkflowNode).filter(WorkflowNode.task_id.in_(task_ids)).delete(synchronize_session=False)
+        db.query(Task).filter(Task.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+    # -------------------------------
+    # Entry points
+    # -------------------------------
+    def schedule(self, user, task_type, payload, run_at=None):
+        run_at = (run_at or datetime.now()).strftime("%Y-%m-%d %H:%M")
+
+        with self.metrics.measure("schedule_task"):
+            res = self.client.post(
+                "/schedule-task/",
+                json={"run_at": run_at, "task_type": task_type, "payload": payload},
+                headers=user["headers"],
+            )
+
+        res.raise_for_status()
+        task_id = res.json()["task_id"]
+
+        self.metrics.scheduled_at[task_id] = time.perf_counter()
+        self.metrics.task_owner[task_id] = user["id"]
+        return task_id
+
+    def list_tasks(self, user):
+        with self.metrics.measure("list_tasks"):
+            res = self.client.get("/tasks/", headers=user["headers"])
+
+        res.raise_for_status()
+        return res.json()
+
+    def tick(self):
+        with self.metrics.measure("check_scheduled_tasks"):
+            self.scheduler.check_scheduled_tasks()
+
+    def run_worker(self, limit=None):
+        # Plays a single worker consuming the broker (up to `limit` messages)
+        done = 0
+
+        while limit is None or done < limit:
+            messages = self.broker.pop(None if limit is None else limit - done)
+            if not messages:
+                return done
+
+            for message in messages:
+                task_id = message["args"][0]
+
+                with self.metrics.measure("execute_task"):
+                    self.tasks.execute_task.apply(args=message["args"])
+
+                self.metrics.completed_at[task_id] = time.perf_counter()
+                done += 1
+
+        return done
+
+    def run_workers(self, threads):
+        # `threads` concurrent workers (like celery -c N) sharing this
+        # process's connection pool. Returns ids of tasks that errored.
+        messages = queue.Queue()
+        for message in self.broker.pop():
+            messages.put(message)
+
+        failed = []
+
+        def work():
+            while True:
+                try:
+                    message = messages.get_nowait()
+                except queue.Empty:
+                    return
+
+                task_id = message["args"][0]
+
+                with self.metrics.measure("execute_task"):
+                    result = self.tasks.execute_task.apply(args=message["args"])
+
+                if result.failed():
+                    failed.append(task_id)
+                self.metrics.completed_at[task_id] = time.perf_counter()
+
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        return failed
+
+    def drain(self):
+        # Beat ticks + worker until nothing is dispatched (in-flight caps
+        # may need several ticks to release a big burst)
+        done = 0
+
+        while True:
+            self.tick()
+            ran = self.run_worker()
+            if not ran:
+                return done
+            done += ran
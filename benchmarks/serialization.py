@@ -0,0 +1,143 @@
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.harness import configure_env, DEFAULT_DATABASE_URL
+
+
+# =====================================================
+# ✅ GET /tasks/ Serialization Cost (per N tasks)
+# =====================================================
+# Times the two halves of a listing response on an in-memory SQLite
+# copy, so the database itself is not what's measured:
+#   hydrate   - query -> Python objects
+#   serialize - Python objects -> JSON bytes
+# "legacy" is the old path (ORM instances -> dicts -> jsonable_encoder
+# -> json.dumps), "typed" is what list_tasks does now (column rows ->
+# TaskListResponse -> pydantic-core dump_json).
+
+
+def seed_tasks(session, Task, count):
+    now = datetime.utcnow()
+
+    session.bulk_insert_mappings(Task, [
+        {
+            "id": str(uuid.uuid4()),
+            "status": "SUCCESS",
+            "task_type": "send_email",
+            "payload": {"to": f"user{i}@bench.local", "subject": f"Bench {i}", "body": "hello " * 20},
+            "retries": 0,
+            "run_at": now - timedelta(seconds=i),
+            "created_at": now - timedelta(seconds=i),
+            "completed_at": now,
+            "result": f"✅ Email sent successfully to user{i}@bench.local",
+            "logs": "[00:00:00] 🚀 Task Started (type=send_email) [Try 1/4]\n" * 4,
+            "user_id": "bench",
+        }
+        for i in range(count)
+    ])
+    session.commit()
+
+
+def legacy_path(session, Task):
+    from fastapi.encoders import jsonable_encoder
+
+    start = time.perf_counter()
+    tasks = session.query(Task).filter(Task.user_id == "bench").all()
+    body = {
+        "count": len(tasks),
+        "tasks": [
+            {
+                "id": t.id,
+                "status": t.status,
+                "task_type": t.task_type,
+                "payload": t.payload,
+                "payload_blob": t.payload_blob,
+                "payload_size": t.payload_size,
+                "retries": t.retries,
+                "result": t.result,
+                "result_blob": t.result_blob,
+                "error_message": t.error_message,
+                "error_message_blob": t.error_message_blob,
+                "run_at": t.run_at,
+                "created_at": t.created_at,
+                "completed_at": t.completed_at,
+                "logs": t.logs
+            }
+            for t in tasks
+        ]
+    }
+    hydrated = time.perf_counter()
+
+    # What JSONResponse.render() does after jsonable_encoder
+    content = json.dumps(
+        jsonable_encoder(body), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+    done = time.perf_counter()
+
+    session.expunge_all()
+    return hydrated - start, done - hydrated, content
+
+
+def typed_path(session, Task, columns, adapter):
+    start = time.perf_counter()
+    tasks = session.query(*columns).filter(Task.user_id == "bench").all()
+    hydrated = time.perf_counter()
+
+    # What FastAPI does for a response_model with the default response class
+    value = adapter.validate_python({"count": len(tasks), "tasks": tasks}, from_attributes=True)
+    content = adapter.dump_json(value)
+    done = time.perf_counter()
+
+    return hydrated - start, done - hydrated, content
+
+
+def run_serialization(count=10000, repeat=5):
+    # app.* reads settings at import, the app engine itself stays unused
+    configure_env(DEFAULT_DATABASE_URL)
+
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from app.database import Base
+    from app.models import Task
+    from app.schemas import TaskListResponse
+    from app.routes.task_routes import TASK_LIST_COLUMNS
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = Session(bind=engine)
+    seed_tasks(session, Task, count)
+
+    adapter = TypeAdapter(TaskListResponse)
+    paths = {
+        "legacy": lambda: legacy_path(session, Task),
+        "typed": lambda: typed_path(session, Task, TASK_LIST_COLUMNS, adapter),
+    }
+
+    result = {"workload": "serialization", "tasks": count, "repeat": repeat, "paths": {}}
+
+    for name, path in paths.items():
+        path()   # warm-up (statement compilation, adapters)
+
+        runs = [path() for _ in range(repeat)]
+        hydrate = statistics.median(r[0] for r in runs)
+        serialize = statistics.median(r[1] for r in runs)
+
+        result["paths"][name] = {
+            "hydrate_ms": round(hydrate * 1000, 2),
+            "serialize_ms": round(serialize * 1000, 2),
+            "total_ms": round((hydrate + serialize) * 1000, 2),
+            "bytes": len(runs[-1][2]),
+        }
+
+    session.close()
+    engine.dispose()
+
+    legacy, typed = result["paths"]["legacy"], result["paths"]["typed"]
+    result["speedup"] = round(legacy["total_ms"] / typed["total_ms"], 2) if typed["total_ms"] else None
+
+    return result
@@ -0,0 +1,229 @@
+import random
+import time
+import uuid
+from datetime import datetime
+from unittest import mock
+
+from benchmarks.harness import summarize_ms, StubSMTP
+
+
+# =====================================================
+# ✅ Task Type Mixes
+# =====================================================
+DEFAULT_MIX = {"send_message": 60, "send_email": 30, "generate_report": 10}
+SKEWED_MIX = {"send_message": 90, "send_email": 9, "generate_report": 1}
+
+
+def parse_mix(text):
+    # "send_message=90,send_email=9,generate_report=1"
+    mix = {}
+    for part in text.split(","):
+        task_type, _, weight = part.partition("=")
+        mix[task_type.strip()] = float(weight or 1)
+    return mix
+
+
+def make_payload(task_type, i, payload_bytes=0):
+    filler = "x" * payload_bytes
+
+    if task_type == "send_email":
+        return {"to": f"user{i}@bench.local", "subject": f"Bench {i}", "body": filler or "hello"}
+
+    if task_type == "generate_report":
+        return {"title": f"Bench Report {i}", "content": filler[:200] or "bench content"}
+
+    return filler or f"bench message {i}"
+
+
+def pick_types(mix, count, rng):
+    types = list(mix)
+    return rng.choices(types, weights=[mix[t] for t in types], k=count)
+
+
+# =====================================================
+# ✅ Workloads
+# =====================================================
+# Every workload takes the harness + its own params, drives the
+# real entry points and leaves measurements on harness.metrics.
+
+def burst(h, tasks=500, users=1, mix=None, payload_kb=0, seed=1, **_):
+    # Many tasks scheduled for the same minute, dispatched by one tick
+    rng = random.Random(seed)
+    owners = h.create_users(users)
+
+    for i, task_type in enumerate(pick_types(mix or DEFAULT_MIX, tasks, rng)):
+        h.schedule(owners[i % users], task_type, make_payload(task_type, i, payload_kb * 1024))
+
+    h.drain()
+
+    for owner in owners:
+        h.list_tasks(owner)
+
+
+def many_users(h, users=50, tasks=1000, polls=3, mix=None, payload_kb=0, seed=2, **_):
+    # Many tenants scheduling a few tasks each and polling their lists
+    rng = random.Random(seed)
+    owners = h.create_users(users)
+
+    for i, task_type in enumerate(pick_types(mix or DEFAULT_MIX, tasks, rng)):
+        h.schedule(rng.choice(owners), task_type, make_payload(task_type, i, payload_kb * 1024))
+
+    h.drain()
+
+    for _ in range(polls):
+        for owner in owners:
+            h.list_tasks(owner)
+
+
+def large_logs(h, tasks=200, log_kb=64, polls=10, **_):
+    # Finished tasks with wide rows, polled the way the dashboard does
+    from app.models import Task
+
+    owner = h.create_users(1)[0]
+    line = "[00:00:00] " + "L" * 117 + "\n"
+    logs = line * max(1, (log_kb * 1024) // len(line))
+
+    db = h.SessionLocal()
+    now = datetime.now()
+
+    for i in range(tasks):
+        db.add(Task(
+            id=str(uuid.uuid4()),
+            status="SUCCESS",
+            task_type="send_message",
+            payload=f"bench message {i}",
+            retries=0,
+            run_at=now,
+            started_at=now,
+            completed_at=now,
+            logs=logs,
+            result=f"Message sent: bench message {i}",
+            user_id=owner["id"],
+        ))
+
+    db.commit()
+    db.close()
+
+    for _ in range(polls):
+        h.list_tasks(owner)
+
+
+def skewed_mix(h, tasks=500, users=10, mix=None, payload_kb=0, seed=3, **_):
+    # Heavily skewed task-type mix across a handful of tenants
+    burst(h, tasks=tasks, users=users, mix=mix or SKEWED_MIX, payload_kb=payload_kb, seed=seed)
+
+
+def fair_share(h, tasks=2000, users=10, small_tasks=5, worker_batch=50, **_):
+    # One large tenant bursts `tasks` and its backlog starts dispatching,
+    # then `users` small tenants schedule a few each. The worker only gets
+    # through `worker_batch` tasks per beat tick, so whatever is already
+    # queued ahead of the small tenants decides how long they wait.
+    large = h.create_users(1)[0]
+    small = h.create_users(users)
+
+    for i in range(tasks):
+        h.schedule(large, "send_message", make_payload("send_message", i))
+
+    h.tick()
+    h.run_worker(limit=worker_batch)
+
+    for i in range(small_tasks):
+        for owner in small:
+            h.schedule(owner, "send_message", make_payload("send_message", i))
+
+    while True:
+        h.tick()
+        if not h.broker.messages:
+            break
+        h.run_worker(limit=worker_batch)
+
+    return {
+        "tenant_lag_ms": {
+            "large": summarize_ms(h.metrics.lags({large["id"]})),
+            "small": summarize_ms(h.metrics.lags({u["id"] for u in small})),
+        }
+    }
+
+
+def connection_limit(h, tasks=500, users=5, workers=32, io_delay=0.05, **_):
+    # How many tasks run at once on a fixed connection budget (pass
+    # --db-pool-size to pin it, no overflow). `workers` threads execute
+    # send_email tasks whose SMTP round trip takes `io_delay` s: a worker
+    # that holds its connection through the handler caps concurrency at
+    # the pool size, short transactions let every worker overlap its I/O.
+    from app.config import settings
+
+    owners = h.create_users(users)
+
+    for i in range(tasks):
+        h.schedule(owners[i % users], "send_email", make_payload("send_email", i))
+
+    # Spread over tenants so in-flight caps don't hold any back
+    h.tick()
+
+    with mock.patch.object(StubSMTP, "latency", io_delay):
+        start = time.perf_counter()
+        failed = h.run_workers(workers)
+        wall = time.perf_counter() - start
+
+    done = len(h.metrics.completed_at) - len(failed)
+
+    return {
+        "connection_limit": {
+            "max_connections": settings.db_pool_size + settings.db_max_overflow,
+            "workers": workers,
+            "io_delay_s": io_delay,
+            "connections_peak": h.metrics.connections_peak,
+            # Average number of handlers in flight
+            "effective_concurrency": round(done * io_delay / wall, 2) if wall else None,
+            "failed": len(failed),
+        }
+    }
+
+
+# =====================================================
+# ✅ Workflow Graphs (fan-in)
+# =====================================================
+# a -> (b, c) -> d -> e
+DIAMOND = [("a", []), ("b", ["a"]), ("c", ["a"]), ("d", ["b", "c"]), ("e", ["d"])]
+
+
+def create_diamond(h, owner, root_type="send_message", root_payload="root"):
+    tasks = [
+        {
+            "key": key,
+            "task_type": root_type if not parents else "send_message",
+            "payload": root_payload if not parents else f"node {key}",
+            "depends_on": parents,
+        }
+        for key, parents in DIAMOND
+    ]
+
+    with h.metrics.measure("create_workflow"):
+        res = h.client.post("/workflows/", json={"tasks": tasks}, headers=owner["headers"])
+
+    res.raise_for_status()
+    return res.json()["tasks"]
+
+
+def workflow(h, tasks=20, **_):
+    # `tasks` diamonds created at once and drained: create_workflow
+    # latency plus fan-in release through the worker. The graph logic
+    # itself is checked in tests/test_workflows.py.
+    owner, = h.create_users(1)
+
+    for _ in range(tasks):
+        create_diamond(h, owner)
+
+    h.drain()
+
+
+WORKLOADS = {
+    "burst": burst,
+    "many_users": many_users,
+    "large_logs": large_logs,
+    "skewed_mix": skewed_mix,
+    "fair_share": fair_share,
+    "connection_limit": connection_limit,
+    "workflow": workflow,
+}
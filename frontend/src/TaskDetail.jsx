@@ -67,6 +67,9 @@ export default function TaskDetail() {
         SCHEDULED: "bg-yellow-500/10 text-yellow-400 border-yellow-500/20",
         CANCELLED: "bg-slate-500/10 text-slate-400 border-slate-500/20",
         PENDING: "bg-purple-500/10 text-purple-400 border-purple-500/20",
+        CANCELLING: "bg-slate-500/10 text-slate-400 border-slate-500/20 animate-pulse",
+        WAITING: "bg-sky-500/10 text-sky-400 border-sky-500/20",
+        UPSTREAM_FAILED: "bg-orange-500/10 text-orange-400 border-orange-500/20",
       };
   
       const icons = {
@@ -152,6 +155,11 @@ export default function TaskDetail() {
                     <h3 className="text-sm font-semibold text-white flex items-center gap-2 mb-4">
                         <Server className="w-4 h-4 text-amber-400" />
                         System Logs
+                        {task.logs_offset > 0 && (
+                            <span className="ml-auto text-xs font-normal text-slate-500">
+                                last {task.logs_total - task.logs_offset} of {task.logs_total} chars
+                            </span>
+                        )}
                     </h3>
                     <div className="flex-1 bg-black/40 rounded-xl p-4 border border-slate-800/50 font-mono text-xs text-slate-400 leading-relaxed overflow-y-auto custom-scrollbar">
                          {task.logs ? (
@@ -49,6 +49,9 @@ export default function TaskTable({ tasks, refreshTasks }) {
       SCHEDULED: "bg-yellow-500/10 text-yellow-400 border-yellow-500/20",
       CANCELLED: "bg-slate-500/10 text-slate-400 border-slate-500/20",
       PENDING: "bg-purple-500/10 text-purple-400 border-purple-500/20",
+      CANCELLING: "bg-slate-500/10 text-slate-400 border-slate-500/20 animate-pulse",
+      WAITING: "bg-sky-500/10 text-sky-400 border-sky-500/20",
+      UPSTREAM_FAILED: "bg-orange-500/10 text-orange-400 border-orange-500/20",
     };
 
     const icons = {
@@ -232,7 +235,7 @@ export default function TaskTable({ tasks, refreshTasks }) {
                                 <Eye className="w-3.5 h-3.5" />
                             </button>
 
-                            {(task.status === "SCHEDULED" || task.status === "PENDING") && (
+                            {["SCHEDULED", "PENDING", "WAITING", "RETRYING", "RUNNING"].includes(task.status) && (
                                 <button
                                 onClick={() => cancelTask(task.id)}
                                 className="p-1.5 text-slate-500 hover:text-red-400 hover:bg-red-500/10 rounded-md transition-all"
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+
+# =====================================================
+# ✅ Harness on the SQLite stand-in
+# =====================================================
+# app.* binds its engine at import, so one harness serves the whole
+# session. Users (and everything they own) are removed on close.
+
+@pytest.fixture(scope="session")
+def harness(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("app")
+    os.environ["BLOB_DIR"] = str(tmp / "blobs")
+    os.environ["REPORT_DIR"] = str(tmp / "reports")
+
+    from benchmarks.harness import Harness
+
+    h = Harness(f"sqlite:///{tmp}/test.db")
+    yield h
+    h.close()
+
+
+@pytest.fixture
+def owner(harness):
+    return harness.create_users(1)[0]
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+
+# =====================================================
+# ✅ GET /tasks/{task_id}/blobs/{field}
+# =====================================================
+def schedule(h, user, task_type, payload):
+    res = h.client.post(
+        "/schedule-task/",
+        json={"run_at": datetime.now().strftime("%Y-%m-%d %H:%M"), "task_type": task_type, "payload": payload},
+        headers=user["headers"],
+    )
+    res.raise_for_status()
+    return res.json()["task_id"]
+
+
+def get_blob_field(h, user, task_id, field):
+    return h.client.get(f"/tasks/{task_id}/blobs/{field}", headers=user["headers"])
+
+
+def test_inline_and_offloaded_payload(harness, owner):
+    small = schedule(harness, owner, "send_message", "hello")
+    large = schedule(harness, owner, "send_message", "x" * 10000)
+
+    assert get_blob_field(harness, owner, small, "payload").json()["value"] == "hello"
+    assert get_blob_field(harness, owner, large, "payload").json()["value"] == "x" * 10000
+
+    harness.drain()
+
+
+def test_traceback_not_offloaded(harness, owner):
+    # Short tracebacks stay in the logs, only big ones get a blob
+    task_id = schedule(harness, owner, "send_email", {"subject": "no recipient"})
+    harness.drain()
+
+    res = get_blob_field(harness, owner, task_id, "traceback")
+    assert res.status_code == 200
+    assert res.json()["value"] is None
+
+
+def test_owner_only(harness, owner):
+    other = harness.create_users(1)[0]
+    task_id = schedule(harness, owner, "send_message", "mine")
+
+    assert get_blob_field(harness, other, task_id, "payload").status_code == 403
+    assert get_blob_field(harness, owner, "missing", "payload").status_code == 404
+    assert get_blob_field(harness, owner, task_id, "logs").status_code == 404
+
+    harness.drain()
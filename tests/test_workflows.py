@@ -0,0 +1,169 @@
+from datetime import datetime
+from unittest import mock
+
+from benchmarks.harness import StubSMTP
+from benchmarks.workloads import DIAMOND, create_diamond
+
+
+# =====================================================
+# ✅ Helpers
+# =====================================================
+def graph_state(h, ids):
+    # {key: (status, pending_deps)}
+    from app.models import Task, WorkflowNode
+
+    db = h.SessionLocal()
+    rows = dict(
+        (task_id, (status, pending))
+        for task_id, status, pending in db.query(Task.id, Task.status, WorkflowNode.pending_deps)
+        .outerjoin(WorkflowNode, WorkflowNode.task_id == Task.id)
+        .filter(Task.id.in_(list(ids.values())))
+        .all()
+    )
+    db.close()
+
+    return {key: rows[task_id] for key, task_id in ids.items()}
+
+
+def statuses(h, ids):
+    return {key: status for key, (status, _) in graph_state(h, ids).items()}
+
+
+def schedule(h, user, deps):
+    return h.client.post(
+        "/schedule-task/",
+        json={
+            "run_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "task_type": "send_message",
+            "payload": "dep",
+            "depends_on": deps,
+        },
+        headers=user["headers"],
+    )
+
+
+# =====================================================
+# ✅ Fan-in
+# =====================================================
+def test_diamond_releases_on_last_parent(harness, owner):
+    ids = create_diamond(harness, owner)
+    assert graph_state(harness, ids) == {
+        "a": ("SCHEDULED", 0), "b": ("WAITING", 1), "c": ("WAITING", 1),
+        "d": ("WAITING", 2), "e": ("WAITING", 1),
+    }
+
+    harness.tick()
+    harness.run_worker(limit=1)   # a
+    assert graph_state(harness, ids) == {
+        "a": ("SUCCESS", 0), "b": ("PENDING", 0), "c": ("PENDING", 0),
+        "d": ("WAITING", 2), "e": ("WAITING", 1),
+    }
+
+    harness.run_worker(limit=1)   # b or c
+    state = graph_state(harness, ids)
+    assert sorted([state["b"][0], state["c"][0]]) == ["PENDING", "SUCCESS"]
+    assert state["d"] == ("WAITING", 1)
+
+    harness.drain()
+    assert graph_state(harness, ids) == {key: ("SUCCESS", 0) for key, _ in DIAMOND}
+
+
+def test_bulk_diamonds_finish(harness, owner):
+    bulk = [create_diamond(harness, owner) for _ in range(5)]
+    harness.drain()
+
+    for ids in bulk:
+        assert set(statuses(harness, ids).values()) == {"SUCCESS"}
+
+
+# =====================================================
+# ✅ Failure + Cancel Propagation
+# =====================================================
+def test_failed_root_fails_every_descendant(harness, owner):
+    ids = create_diamond(harness, owner, root_type="send_email", root_payload={"subject": "no recipient"})
+    harness.drain()
+
+    state = statuses(harness, ids)
+    assert state.pop("a") == "FAILED"
+    assert set(state.values()) == {"UPSTREAM_FAILED"}
+
+
+def test_cancel_while_waiting(harness, owner):
+    ids = create_diamond(harness, owner)
+    res = harness.client.post(f"/tasks/{ids['d']}/cancel", headers=owner["headers"])
+    assert res.status_code == 200
+
+    harness.drain()
+    assert statuses(harness, ids) == {
+        "a": "SUCCESS", "b": "SUCCESS", "c": "SUCCESS", "d": "CANCELLED", "e": "UPSTREAM_FAILED",
+    }
+
+
+def test_cancel_while_running_then_fail_does_not_retry(harness, owner):
+    def cancel_then_fail(smtp, msg):
+        harness.client.post(f"/tasks/{ids['a']}/cancel", headers=owner["headers"])
+        raise Exception("SMTP down")
+
+    ids = create_diamond(harness, owner, root_type="send_email", root_payload={"to": "cancel@bench.local"})
+    with mock.patch.object(StubSMTP, "send_message", cancel_then_fail):
+        harness.drain()
+
+    assert statuses(harness, ids) == {
+        "a": "CANCELLED", "b": "UPSTREAM_FAILED", "c": "UPSTREAM_FAILED",
+        "d": "UPSTREAM_FAILED", "e": "UPSTREAM_FAILED",
+    }
+
+
+# =====================================================
+# ✅ depends_on on /schedule-task/
+# =====================================================
+def test_schedule_child_of_pending_parent(harness, owner):
+    parent = schedule(harness, owner, []).json()["task_id"]
+    child = schedule(harness, owner, [parent]).json()["task_id"]
+    assert graph_state(harness, {"child": child})["child"] == ("WAITING", 1)
+
+    harness.drain()
+    assert graph_state(harness, {"child": child})["child"] == ("SUCCESS", 0)
+
+    late = schedule(harness, owner, [parent]).json()["task_id"]
+    assert graph_state(harness, {"late": late})["late"] == ("SCHEDULED", 0)
+
+
+def test_schedule_rejects_foreign_parent(harness, owner):
+    other = harness.create_users(1)[0]
+    parent = schedule(harness, owner, []).json()["task_id"]
+
+    assert schedule(harness, other, [parent]).status_code == 404
+
+
+def test_schedule_rejects_failed_parent(harness, owner):
+    failed = create_diamond(harness, owner, root_type="send_email", root_payload={})
+    harness.drain()
+
+    assert schedule(harness, owner, [failed["a"]]).status_code == 400
+
+
+def test_schedule_rejects_parents_from_different_workflows(harness, owner):
+    first = create_diamond(harness, owner)
+    second = create_diamond(harness, owner)
+
+    res = schedule(harness, owner, [first["e"], second["e"]])
+    assert res.status_code == 400
+
+    # Standalone parents still join the workflow of the others
+    loose = schedule(harness, owner, []).json()["task_id"]
+    assert schedule(harness, owner, [first["e"], loose]).status_code == 200
+
+    harness.drain()
+
+
+# =====================================================
+# ✅ Cycles
+# =====================================================
+def test_cycle_is_rejected(harness, owner):
+    res = harness.client.post("/workflows/", json={"tasks": [
+        {"key": "x", "task_type": "send_message", "payload": "x", "depends_on": ["y"]},
+        {"key": "y", "task_type": "send_message", "payload": "y", "depends_on": ["x"]},
+    ]}, headers=owner["headers"])
+
+    assert res.status_code == 400